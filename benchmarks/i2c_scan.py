@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the I2C component detection.
+
+Runs the detection of the I2C components of the DB21J with a Jetson Nano B01 carrier board
+(the `_DB21J_NanoB01` robot, 10 buses: 1, 2 and the 8 channels 9-16 of the front bumper
+multiplexer on bus 1) against a fake SMBus backend that takes `--latency` seconds per probed
+address, and compares:
+
+    sequential  every bus fully probed one after the other (the original detection)
+    grouped     independent buses probed in parallel, all addresses
+    targeted    independent buses probed in parallel, only the addresses of known components
+
+For each mode it reports the time to the first partial result and the total detection time.
+The camera is left out, its bus (6) is not among those returned by `get_i2c_buses()`.
+
+    PYTHONPATH=packages python3 benchmarks/i2c_scan.py --latency 0.001
+
+The robot is imported from robot.duckiebot, `dt_robot_utils` has to be available.
+"""
+
+import argparse
+import errno
+import os
+import sys
+import time
+import types
+from typing import Dict, Set, List, Tuple, Optional
+
+# the fake backend replaces the real one, the detection runs in-process
+os.environ["COLLECTOR_ISOLATION"] = "0"
+
+# the bus tree, filled in from the robot once imported (bus -> parent bus)
+ROOTS: Dict[int, Optional[int]] = {}
+# HAT, screen and IMU on bus 1, front-center ToF behind the front bumper multiplexer
+DEVICES: Dict[int, Set[int]] = {
+    1: {0x3c, 0x40, 0x68, 0x70},
+    15: {0x29},
+}
+
+
+class FakeSMBus:
+    latency: float = 0.001
+
+    def __init__(self, number: int):
+        if number not in ROOTS:
+            raise FileNotFoundError(number)
+        # the channels of the multiplexer also see the devices on the parent bus
+        self._devices = DEVICES.get(number, set()) | DEVICES.get(ROOTS[number], set())
+
+    def read_byte(self, address: int):
+        time.sleep(self.latency)
+        if address not in self._devices:
+            raise OSError(errno.ENXIO, "No such device or address")
+        return 0
+
+    def close(self):
+        pass
+
+
+sys.modules["smbus"] = types.SimpleNamespace(SMBus=FakeSMBus)
+
+import robot.types  # noqa: E402
+from robot.duckiebot.db21j import _DB21J_NanoB01  # noqa: E402
+from robot.i2c import I2CScanner  # noqa: E402
+from robot.types import HardwareComponent, I2CBus, I2CBusAnyOf, Robot  # noqa: E402
+
+
+def _components() -> List[HardwareComponent]:
+    robot_buses = set(_DB21J_NanoB01.get_i2c_buses())
+    components = [
+        component for component in _DB21J_NanoB01()._get_components()
+        if component.bus and Robot._i2c_buses(component) and
+        all(bus.number in robot_buses for bus in Robot._i2c_buses(component))
+    ]
+    # the buses are shared by the instances of the robot, start from a clean state
+    for component in components:
+        component.detected = False
+        component.bus.reset()
+        for bus in Robot._i2c_buses(component):
+            ROOTS[bus.number] = bus.parent.number if bus.parent else None
+    return components
+
+
+def _sequential(components: List[HardwareComponent], progress):
+    # the original detection: each bus fully probed when its first component is reached
+    scanner = I2CScanner(workers=1)
+    for component in components:
+        for bus in Robot._i2c_buses(component):
+            # parents first, the detections on a channel are computed against its parent
+            chain: List[I2CBus] = []
+            while bus is not None:
+                chain.insert(0, bus)
+                bus = bus.parent
+            for bus in chain:
+                try:
+                    bus.detect(None, scanner, cached=False)
+                except RuntimeError as e:
+                    print("WARNING", str(e))
+        if isinstance(component.bus, I2CBusAnyOf):
+            component.bus.detect()
+        component.detected = component.bus.has(component.address)
+        progress(component)
+
+
+def _run(mode: str) -> Tuple[float, float, int]:
+    components = _components()
+    reported = []
+    started = time.perf_counter()
+
+    def progress(_):
+        reported.append(time.perf_counter() - started)
+
+    if mode == "sequential":
+        _sequential(components, progress)
+    else:
+        robot.types.I2C_SCAN_TARGETED = mode == "targeted"
+        Robot._detect_components(components, progress, cached=False)
+    total = time.perf_counter() - started
+    return reported[0], total, sum(c.detected for c in components)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.001,
+                        help="seconds taken by the fake bus to probe one address")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    FakeSMBus.latency = args.latency
+
+    print(f"{'mode':<12}{'first result':>14}{'total':>10}{'detected':>10}")
+    for mode in ["sequential", "grouped", "targeted"]:
+        runs = [_run(mode) for _ in range(args.repeat)]
+        first, total, detected = min(runs, key=lambda r: r[1])
+        print(f"{mode:<12}{first * 1000:>12.1f}ms{total * 1000:>8.1f}ms{detected:>10}")
+
+
+if __name__ == '__main__':
+    main()
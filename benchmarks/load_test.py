@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Load test for the device health API.
+
+Simulates N concurrent dashboard clients polling the API over keep-alive connections and
+reports throughput and latency percentiles. Compare the development and production servers
+by running the test against the API started with and without HEALTH_API_PRODUCTION_SERVER:
+
+    python3 -m health_api.main                                      # development server
+    HEALTH_API_PRODUCTION_SERVER=1 python3 -m health_api.main       # waitress
+
+    python3 benchmarks/load_test.py --host <robot> --clients 32 --duration 20
+
+Without a robot, `--serve development|production` serves a stand-in app (a JSON body the
+size of the one returned by /) through the same server code, run it in a separate terminal:
+
+    PYTHONPATH=packages python3 benchmarks/load_test.py --serve production
+"""
+
+import argparse
+import http.client
+import json
+import statistics
+import threading
+import time
+from typing import List
+
+
+def _client(host: str, port: int, path: str, deadline: float, latencies: List[float],
+            errors: List[str], lock: threading.Lock):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    local: List[float] = []
+    while time.monotonic() < deadline:
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 500:
+                raise http.client.HTTPException(f"HTTP {response.status}")
+        except (OSError, http.client.HTTPException) as e:
+            with lock:
+                errors.append(str(e))
+            # reconnect, the server may have closed the connection
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+            continue
+        local.append(time.perf_counter() - start)
+    conn.close()
+    with lock:
+        latencies.extend(local)
+
+
+def _serve(mode: str, port: int):
+    from flask import Flask, Response
+    from health_api.server import HealthAPIServer
+
+    app = Flask(__name__)
+    # about the size of the body returned by / on a robot
+    body = json.dumps({f"resource{i}": {"value": i, "text": "x" * 64} for i in range(48)})
+
+    @app.route('/')
+    def _all():
+        return Response(body, mimetype="application/json")
+
+    HealthAPIServer(app, "0.0.0.0", port, production=mode == "production").serve()
+
+
+def _percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8085)
+    parser.add_argument("--path", default="/")
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--serve", choices=["development", "production"],
+                        help="serve the stand-in app instead of running the test")
+    args = parser.parse_args()
+    if args.serve:
+        _serve(args.serve, args.port)
+        return
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+    clients = [
+        threading.Thread(target=_client, daemon=True,
+                         args=(args.host, args.port, args.path, deadline, latencies, errors, lock))
+        for _ in range(args.clients)
+    ]
+    started = time.monotonic()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.monotonic() - started
+
+    print(f"clients:     {args.clients}")
+    print(f"requests:    {len(latencies)} ({len(errors)} errors)")
+    print(f"throughput:  {len(latencies) / elapsed:.1f} req/s")
+    if latencies:
+        print(f"latency p50: {statistics.median(latencies) * 1000:.1f} ms")
+        print(f"latency p99: {_percentile(latencies, 99) * 1000:.1f} ms")
+        print(f"latency max: {max(latencies) * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
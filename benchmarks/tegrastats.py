@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the tegrastats decoders.
+
+Decodes tegrastats logs (one line per sample, as written by `tegrastats --logfile <file>`)
+with the original regex-based decoder and with the single-pass parser, and reports the number
+of lines per second each one processes and how many lines each one could not decode.
+
+The logs in benchmarks/data are not recordings, their lines are generated (with random
+values) in the format of the Jetson Nano (L4T 32) and of the Jetson Orin Nano (L4T 35).
+Logs recorded on a robot can be given instead.
+
+    PYTHONPATH=packages python3 benchmarks/tegrastats.py [--log <file> ...]
+"""
+
+import argparse
+import glob
+import os
+import re
+import time
+from typing import List, Callable, Tuple
+
+from health_api.knowledge_base import KnowledgeBase
+from health_api.tegrastats_api import parse_tegrastats, decode_tegrastats
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+
+# the original decoder, three regular expressions and three updates of the knowledge base
+GPU_USAGE_RE = re.compile(r"GR3D_FREQ (\d+)%")
+GPU_TEMP_RE = re.compile(r"GPU@(\d+(?:\.\d+)?)C")
+GPU_POWER_RE = re.compile(r"POM_5V_GPU (\d+)/(\d+)")
+
+
+def _regex_decode(output):
+    gpu_temp_match = GPU_TEMP_RE.search(output)
+    KnowledgeBase.set("GPU_TEMP", float(gpu_temp_match.group(1)))
+
+    gpu_usage_match = GPU_USAGE_RE.search(output)
+    KnowledgeBase.set("GPU_USAGE", float(gpu_usage_match.group(1)))
+
+    gpu_power_match = GPU_POWER_RE.search(output)
+    KnowledgeBase.set("GPU_POWER", int(gpu_power_match.group(1))/1000.0)
+
+
+def _run(decoder: Callable[[str], object], lines: List[str], repeat: int) -> Tuple[float, int]:
+    failures = 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for line in lines:
+            try:
+                decoder(line)
+            except Exception:
+                failures += 1
+    elapsed = time.perf_counter() - started
+    return len(lines) * repeat / elapsed, failures // repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--log", nargs="*",
+                        default=sorted(glob.glob(os.path.join(DATA_DIR, "*.log"))))
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    decoders = [
+        ("regex (original)", _regex_decode),
+        ("parse only", parse_tegrastats),
+        ("parse + publish", decode_tegrastats),
+    ]
+    for log in args.log:
+        with open(log, "rt") as fin:
+            lines = [line for line in fin.read().splitlines() if line.strip()]
+        print(f"{os.path.basename(log)} ({len(lines)} lines)")
+        for name, decoder in decoders:
+            rate, failures = _run(decoder, lines, args.repeat)
+            print(f"  {name:<18}{rate:>12,.0f} lines/s{failures:>8} failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,9 +1,10 @@
+import asyncio
 import dataclasses
 import re
 import time
 import traceback
 from logging import Logger
-from threading import Thread
+from threading import Thread, Event
 from typing import Callable, Optional
 
 import serial
@@ -11,8 +12,8 @@ import yaml
 import semver
 from serial.tools.list_ports import grep as serial_grep
 
-from dt_class_utils import DTReminder
-from .constants import BATTERY_PCB16_READY_VID, BATTERY_PCB16_READY_PID, BATTERY_PCB16_BAUD_RATE
+from .constants import BATTERY_PCB16_READY_VID, BATTERY_PCB16_READY_PID, BATTERY_PCB16_BAUD_RATE, \
+    BATTERY_RESET_SECS
 from .history import BatteryHistory
 
 KELVIN_TO_CELSIUS = lambda k: k - 273.15
@@ -88,7 +89,11 @@ class Battery:
         if not callable(callback):
             raise ValueError('Callback must be a callable object.')
         self._callback = callback
-        self._reset_reminder = DTReminder(period=5)
+        # set when serial devices appear or disappear (see on_devices_changed)
+        self._devices_changed = Event()
+        self._hotplug = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_devices_changed: Optional[asyncio.Event] = None
         self._worker = Thread(target=self._work)
         self._history = BatteryHistory()
 
@@ -108,8 +113,20 @@ class Battery:
     def shutdown(self):
         #   This is NOT a battery shutdown, it simply shuts down the drivers
         self._is_shutdown = True
+        self._devices_changed.set()
         self.join()
 
+    def use_hotplug_events(self):
+        # devices are announced through on_devices_changed(), stop polling for them
+        self._hotplug = True
+
+    def on_devices_changed(self):
+        # called (from any thread) when a serial device appears or disappears
+        self._devices = []
+        self._devices_changed.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._async_devices_changed.set)
+
     def turn_off(self, timeout: int = 20, wait: bool = False, callback: Optional[Callable] = None):
         #   This is a battery shutdown, the power will be cut off after `timeout` seconds
         firmware_version = self.info.get("version")
@@ -172,19 +189,7 @@ class Battery:
 
     def _read_next(self, dev, quiet: bool = True):
         try:
-            raw = dev.read_until().decode('utf-8', 'ignore')
-            cleaned = re.sub(r"\x00\s*", "", raw).rstrip()
-            cleaned = re.sub(r"-\s+", "-", cleaned)
-            try:
-                # if "}{" present, get the first for checking shutdown ACK
-                if "}{" in cleaned:
-                    cleaned = cleaned.split("}{")[0] + "}"
-                parsed = yaml.load(cleaned, yaml.SafeLoader)
-                return parsed
-            except yaml.YAMLError as e:
-                if self._logger:
-                    self._logger.error(str(e))
-                return None
+            return self._parse(dev.read_until())
         except BaseException as e:
             if quiet:
                 # do not print, it would swamp the logs
@@ -192,6 +197,52 @@ class Battery:
             else:
                 raise e
 
+    def _parse(self, raw: bytes) -> Optional[dict]:
+        raw = raw.decode('utf-8', 'ignore')
+        cleaned = re.sub(r"\x00\s*", "", raw).rstrip()
+        cleaned = re.sub(r"-\s+", "-", cleaned)
+        try:
+            # if "}{" present, get the first for checking shutdown ACK
+            if "}{" in cleaned:
+                cleaned = cleaned.split("}{")[0] + "}"
+            parsed = yaml.load(cleaned, yaml.SafeLoader)
+            return parsed
+        except yaml.YAMLError as e:
+            if self._logger:
+                self._logger.error(str(e))
+            return None
+
+    def _send_pending_interaction(self, dev):
+        if self._data is not None:
+            # we were able to read from the battery at least once,
+            # consume any pending interaction
+            if self._interaction.active:
+                iname, icmd = self._interaction.name, self._interaction.command
+                # there is a command to be sent, send it and continue
+                self._logger.debug(f"Pending interaction '{iname}' found. "
+                                   f"Sending {str(icmd)} to the battery")
+                dev.write(self._interaction.command)
+                dev.flush()
+
+    def _handle(self, device: str, parsed: dict):
+        # first time we read?
+        if self._device is None:
+            self._device = device
+            self._logger.info('Battery found at {}.'.format(device))
+        # distinguish between 'data' packet and others
+        if 'SOC(%)' in parsed:
+            # this is a 'data' packet
+            self.data = self._format_data(parsed)
+        elif self._interaction.active:
+            iname = self._interaction.name
+            self._logger.debug(f"Received (candidate) response to "
+                               f"interaction '{iname}': {str(parsed)}")
+            if self._interaction.check(parsed):
+                self._logger.debug(f"Received valid response to "
+                                   f"interaction '{iname}': {str(parsed)}")
+                # complete interaction
+                self._interaction.complete(parsed)
+
     def _work(self, quiet: bool = True):
         while True:
             if self._is_shutdown:
@@ -200,9 +251,9 @@ class Battery:
             # if we don't have a battery device, search again
             if len(self._devices) == 0:
                 self._find_device()
-            # if we still don't have it, just sleep for 5 seconds
+            # if we still don't have it, wait for one to show up
             if len(self._devices) == 0:
-                self._logger.warning('No battery found. Retrying in 5 seconds.')
+                self._logger.warning(self._no_battery_message())
             else:
                 # we have at least one candidate device, try reading
                 for device in self._devices:
@@ -213,51 +264,94 @@ class Battery:
                             if self._is_shutdown:
                                 return
                             # ---
-                            if self._data is not None:
-                                # we were able to read from the battery at least once,
-                                # consume any pending interaction
-                                if self._interaction.active:
-                                    iname, icmd = self._interaction.name, self._interaction.command
-                                    # there is a command to be sent, send it and continue
-                                    self._logger.debug(f"Pending interaction '{iname}' found. "
-                                                       f"Sending {str(icmd)} to the battery")
-                                    dev.write(self._interaction.command)
-                                    dev.flush()
+                            self._send_pending_interaction(dev)
                             # ---
                             try:
                                 parsed = self._read_next(dev, quiet=quiet)
                                 if parsed is None:
                                     continue
-                                # first time we read?
-                                if self._device is None:
-                                    self._device = device
-                                    self._logger.info('Battery found at {}.'.format(device))
-                                # distinguish between 'data' packet and others
-                                if 'SOC(%)' in parsed:
-                                    # this is a 'data' packet
-                                    self.data = self._format_data(parsed)
-                                elif self._interaction.active:
-                                    iname = self._interaction.name
-                                    self._logger.debug(f"Received (candidate) response to "
-                                                       f"interaction '{iname}': {str(parsed)}")
-                                    if self._interaction.check(parsed):
-                                        self._logger.debug(f"Received valid response to "
-                                                           f"interaction '{iname}': {str(parsed)}")
-                                        # complete interaction
-                                        self._interaction.complete(parsed)
+                                self._handle(device, parsed)
                             except BaseException as e:
                                 if quiet:
                                     traceback.print_exc()
                                     break
                                 raise e
-            if self._logger:
-                self._logger.warning('An error occurred while reading from the battery.')
-            # allow 5 seconds for things to reset
-            self._reset_reminder.reset()
-            while not self._reset_reminder.is_time():
-                if self._is_shutdown:
-                    return
-                time.sleep(0.5)
+                if self._logger:
+                    self._logger.warning('An error occurred while reading from the battery.')
+            # allow 5 seconds for things to reset (or for a device to show up)
+            self._devices_changed.wait(self._wait_timeout())
+            self._devices_changed.clear()
+
+    async def work_async(self, quiet: bool = True):
+        # same as _work() but reads from the serial device without blocking the event loop
+        self._async_devices_changed = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        while not self._is_shutdown:
+            # if we don't have a battery device, search again
+            if len(self._devices) == 0:
+                self._find_device()
+            # if we still don't have it, wait for one to show up
+            if len(self._devices) == 0:
+                self._logger.warning(self._no_battery_message())
+            else:
+                # we have at least one candidate device, try reading
+                for device in self._devices:
+                    try:
+                        with serial.Serial(device, BATTERY_PCB16_BAUD_RATE, timeout=0) as dev:
+                            await self._read_async(device, dev)
+                    except Exception as e:
+                        if not quiet:
+                            raise e
+                        traceback.print_exc()
+                    if self._is_shutdown:
+                        return
+                if self._logger:
+                    self._logger.warning('An error occurred while reading from the battery.')
+            # allow 5 seconds for things to reset (or for a device to show up)
+            try:
+                await asyncio.wait_for(self._async_devices_changed.wait(), self._wait_timeout())
+            except asyncio.TimeoutError:
+                pass
+            self._async_devices_changed.clear()
+
+    def _wait_timeout(self) -> Optional[float]:
+        # with hot-plug events there is no need to poll for new devices
+        if len(self._devices) == 0 and self._hotplug:
+            return None
+        return BATTERY_RESET_SECS
+
+    def _no_battery_message(self) -> str:
+        if self._hotplug:
+            return 'No battery found. Waiting for one to be plugged in.'
+        return f'No battery found. Retrying in {BATTERY_RESET_SECS} seconds.'
+
+    async def _read_async(self, device: str, dev):
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+
+        def _on_readable():
+            try:
+                chunks.put_nowait(dev.read(dev.in_waiting or 1))
+            except Exception as e:
+                chunks.put_nowait(e)
+
+        loop.add_reader(dev.fileno(), _on_readable)
+        buffer = b''
+        try:
+            while not self._is_shutdown:
+                chunk = await chunks.get()
+                if isinstance(chunk, Exception):
+                    raise chunk
+                buffer += chunk
+                # packets are separated by new lines
+                *lines, buffer = buffer.split(b'\n')
+                for line in lines:
+                    parsed = self._parse(line)
+                    if parsed is not None:
+                        self._handle(device, parsed)
+                    self._send_pending_interaction(dev)
+        finally:
+            loop.remove_reader(dev.fileno())
 
     @staticmethod
     def _format_data(data):
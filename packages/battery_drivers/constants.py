@@ -1,4 +1,6 @@
 BATTERY_PCB16_BAUD_RATE = 9600
+# time allowed for the device to reset after an error
+BATTERY_RESET_SECS = 5
 
 BATTERY_PCB16_READY_VID = "04d8"
 BATTERY_PCB16_READY_PID = "ecb7"
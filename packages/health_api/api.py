@@ -1,16 +1,22 @@
 import logging
 import uuid
-from typing import Union
+from datetime import datetime, timezone
+from typing import Union, List
 
-from flask import Flask, Blueprint, abort, jsonify, request
+from flask import Flask, Blueprint, Response, abort, jsonify, request
 from flask_cors import CORS
 
 from battery_drivers import Battery
 from dt_triggers_utils import set_trigger
-from health_api.boards import get_board
-from health_api.constants import DEBUG
+from health_api.boards import get_board, get_board_profile
+from health_api.breaker import CircuitBreakers
+from health_api.constants import DEBUG, LONG_POLL_MAX_WAIT_SECS
+from health_api.executor import CommandExecutor
 from health_api.knowledge_base import KnowledgeBase
-from health_api.resources import all_resources, cached_resource
+from health_api.resources import all_resources, serialized_resource, serialized_resources, \
+    changed_resources, rescan_components, collector_status, stale_resources, Serialized
+from health_api.supervisor import Supervisor
+from health_api.streaming import stream_resources, subscribe, unsubscribe
 
 __all__ = [
     'HealthAPI'
@@ -43,11 +49,37 @@ api = Blueprint('api', __name__)
 
 @api.route('/')
 def _all():
-    res = {}
-    for resource in all_resources:
-        value = cached_resource(resource)
-        res.update(value)
-    return jsonify(res)
+    # ?resources=cpu,memory selects resources, ?fields=cpu.percentage projects their fields
+    fields = _requested_fields()
+    resources = _requested_resources(fields)
+    _long_poll(resources)
+    return _conditional_response(serialized_resources(resources, fields), resources)
+
+
+@api.route('/delta')
+def _delta():
+    since = request.args.get('since', default=0, type=int)
+    cursor, changed = changed_resources(all_resources, since)
+    return jsonify({'version': cursor, 'resources': changed})
+
+
+@api.route('/stream')
+def _stream():
+    resources = _requested_resources()
+    # resume from the last event received (on reconnect) or from the given version
+    since = request.headers.get('Last-Event-ID', default=None, type=int)
+    if since is None:
+        since = request.args.get('since', default=0, type=int)
+    rate = request.args.get('rate', default=None, type=float)
+    if not subscribe():
+        abort(503)
+    response = Response(
+        stream_resources(resources, since, rate),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(unsubscribe)
+    return response
 
 
 @api.route('/trigger/<string:trigger>')
@@ -86,11 +118,85 @@ def _battery_info():
     return jsonify(info)
 
 
+@api.route('/board')
+def _board():
+    return jsonify(get_board_profile().as_dict())
+
+
+@api.route('/discovery/rescan', methods=['POST'])
+def _discovery_rescan():
+    return jsonify(rescan_components())
+
+
+@api.route('/collectors')
+def _collectors():
+    return jsonify({
+        'supervisor': Supervisor.stats(),
+        'collectors': collector_status(),
+        'breakers': CircuitBreakers.stats()
+    })
+
+
+@api.route('/stats/commands')
+def _commands_stats():
+    return jsonify(CommandExecutor.stats())
+
+
 @api.route('/<string:resource>')
 def _partial(resource: str):
+    if resource not in all_resources:
+        abort(404)
     try:
-        return jsonify(cached_resource(resource))
+        _long_poll([resource])
+        return _conditional_response(serialized_resource(resource), [resource])
     except KeyError:
         abort(404)
     except BaseException as e:
         return str(e)
+
+
+def _requested_resources(fields: List[str] = None) -> List[str]:
+    # comma-separated list of resources, all of them if not given
+    resources = _comma_separated_arg('resources')
+    if not resources:
+        # infer the resources from the requested fields (when possible)
+        resources = list(dict.fromkeys(f.split('.', 1)[0] for f in (fields or [])))
+        if not resources or any(r not in all_resources for r in resources):
+            return list(all_resources)
+        return resources
+    for resource in resources:
+        if resource not in all_resources:
+            abort(404)
+    return resources
+
+
+def _requested_fields() -> List[str]:
+    # comma-separated list of dot-separated paths
+    return _comma_separated_arg('fields')
+
+
+def _comma_separated_arg(name: str) -> List[str]:
+    value = request.args.get(name, default='')
+    return [v.strip() for v in value.split(',') if v.strip()]
+
+
+def _long_poll(resources):
+    # ?wait=<seconds>&version=<v> blocks until the resources move past version v (or timeout)
+    wait = request.args.get('wait', default=0, type=float)
+    version = request.args.get('version', default=None, type=int)
+    if wait <= 0 or version is None:
+        return
+    KnowledgeBase.wait(version, resources, timeout=min(wait, LONG_POLL_MAX_WAIT_SECS))
+
+
+def _conditional_response(serialized: Serialized, resources: List[str]) -> Response:
+    response = Response(serialized.body, mimetype='application/json')
+    response.set_etag(serialized.digest)
+    response.last_modified = datetime.fromtimestamp(int(serialized.modified_time), timezone.utc)
+    response.headers['X-Resource-Version'] = str(serialized.version)
+    # resources served from an earlier collection because their collector timed out
+    stale = stale_resources(resources)
+    if stale:
+        response.headers['X-Stale-Resources'] = ','.join(stale)
+    # turns the response into a '304 Not Modified' if the client already has this content
+    return response.make_conditional(request)
@@ -0,0 +1,176 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Callable, Any
+
+from flask import Flask
+
+from battery_drivers import Battery
+from health_api import logger
+from health_api.boards.jetson_telemetry import JetsonTelemetry
+from health_api.constants import HEALTH_WATCHDOG_FREQUENZY_HZ, ASYNC_RUNTIME_WORKERS, DEBUG, \
+    HEALTH_API_WORKERS
+from health_api.hotplug import HotplugWatcher
+from health_api.knowledge_base import KnowledgeBase
+from health_api.scheduler import ResourceScheduler
+from health_api.tegrastats_api import decode_tegrastats, clear_tegrastats, tegrastats_command
+from health_api.watchdog import check_health
+
+
+class AsyncRuntime:
+    """
+    Hosts the collectors, the watchdog, tegrastats, the battery drivers and the HTTP front end
+    on a single asyncio event loop instead of a thread each.
+
+    Blocking collectors run on a small pool of workers, everything else is driven by the
+    event loop and only wakes up when there is work to do.
+    """
+
+    def __init__(self, app: Flask, scheduler: ResourceScheduler, host: str, port: int,
+                 battery: Optional[Battery] = None, tegrastats: bool = False,
+                 hotplug: Optional[HotplugWatcher] = None,
+                 telemetry: Optional[JetsonTelemetry] = None):
+        self._app = app
+        self._scheduler = scheduler
+        self._host = host
+        self._port = port
+        self._battery = battery
+        self._tegrastats = tegrastats
+        self._hotplug = hotplug
+        self._telemetry = telemetry
+        self._loop = asyncio.new_event_loop()
+        self._executor = ThreadPoolExecutor(max_workers=ASYNC_RUNTIME_WORKERS,
+                                            thread_name_prefix="collector")
+        self._stopped: Optional[asyncio.Event] = None
+        self._http = None
+
+    def run(self):
+        # blocks until shutdown() is called
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._executor.shutdown(wait=True)
+            self._loop.close()
+
+    def shutdown(self):
+        # this can be called from any thread
+        if self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._stop)
+
+    def _stop(self):
+        if self._stopped is not None:
+            self._stopped.set()
+        if self._http is not None:
+            self._http.should_exit = True
+
+    async def _main(self):
+        self._stopped = asyncio.Event()
+        # warm up the cache before serving the first request
+        await self._in_executor(self._scheduler.warmup)
+        tasks: List[asyncio.Task] = [
+            asyncio.ensure_future(self._collect_periodically(resource))
+            for resource in self._scheduler.periodic_resources
+        ]
+        tasks.append(asyncio.ensure_future(self._watchdog()))
+        if self._telemetry is not None:
+            tasks.append(asyncio.ensure_future(self._run_telemetry()))
+        if self._tegrastats:
+            tasks.append(asyncio.ensure_future(self._run_tegrastats()))
+        if self._battery is not None:
+            tasks.append(asyncio.ensure_future(self._battery.work_async()))
+        # hot-plug events are read by the loop itself, subscribers run on the workers
+        hotplug_fd = None
+        if self._hotplug is not None:
+            hotplug_fd = self._hotplug.fileno()
+            self._loop.add_reader(hotplug_fd, self._on_hotplug)
+        # serve HTTP requests
+        self._http = self._http_server()
+        http = asyncio.ensure_future(self._http.serve())
+        # wait for shutdown
+        await self._stopped.wait()
+        # let the HTTP server finish the pending requests, then stop everything else
+        await http
+        if hotplug_fd is not None:
+            self._loop.remove_reader(hotplug_fd)
+            # the watcher is ours to close, the loop was the one reading from it
+            self._hotplug.shutdown()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _http_server(self):
+        import uvicorn
+        from a2wsgi import WSGIMiddleware
+
+        class _Server(uvicorn.Server):
+
+            def install_signal_handlers(self):
+                # signals are handled by DTProcess
+                pass
+
+        # each request runs on a thread of its own pool, so that streams and long-polls
+        # only hold one of the workers, the same way they do with waitress
+        config = uvicorn.Config(
+            WSGIMiddleware(self._app, workers=HEALTH_API_WORKERS),
+            host=self._host,
+            port=self._port,
+            log_level=logging.DEBUG if DEBUG else logging.WARNING,
+        )
+        return _Server(config)
+
+    def _on_hotplug(self):
+        # the event is pending, the read does not block but the subscribers might
+        event = self._hotplug.read()
+        if event is not None:
+            self._executor.submit(self._hotplug.notify, event)
+
+    async def _in_executor(self, fcn: Callable, *args) -> Any:
+        return await self._loop.run_in_executor(self._executor, fcn, *args)
+
+    async def _collect_periodically(self, resource: str):
+        await asyncio.sleep(self._scheduler.offset(resource))
+        while True:
+            await self._in_executor(self._scheduler.collect, resource)
+            KnowledgeBase.evict_expired()
+            await asyncio.sleep(self._scheduler.period(resource))
+
+    async def _watchdog(self):
+        sleep_time = 1.0 / HEALTH_WATCHDOG_FREQUENZY_HZ
+        while True:
+            await self._in_executor(check_health)
+            await asyncio.sleep(sleep_time)
+
+    async def _run_telemetry(self):
+        # reading sysfs takes microseconds, no need for a worker
+        while True:
+            # noinspection PyBroadException
+            try:
+                self._telemetry.publish()
+            except Exception as e:
+                logger.warning(f"Could not read the GPU telemetry: {str(e)}")
+            await asyncio.sleep(self._telemetry.period)
+
+    async def _run_tegrastats(self):
+        process = await asyncio.create_subprocess_exec(*tegrastats_command(),
+                                                       stdout=asyncio.subprocess.PIPE)
+        # the GPU telemetry comes from sysfs when possible
+        gpu = self._telemetry is None
+        try:
+            async for line in process.stdout:
+                # noinspection PyBroadException
+                try:
+                    decode_tegrastats(line.decode("utf-8"), gpu)
+                except Exception as e:
+                    logger.warning(f"Could not decode tegrastats output: {str(e)}")
+        finally:
+            clear_tegrastats()
+            if process.returncode is None:
+                process.terminate()
+                await process.wait()
+
+
+__all__ = [
+    'AsyncRuntime'
+]
@@ -1,14 +1,32 @@
+import functools
+
+from health_api.discovery import DiscoveryCache
+from health_api.machine import GenericMachine
 from .raspberry_pi import RaspberryPi
 from .nvidia_jetson import NvidiaJetson
+from .profile import BoardProfile, BoardFamily, Capability, detect_board_profile
+
+
+@functools.lru_cache(maxsize=1)
+def get_board_profile() -> BoardProfile:
+    # the board does not change while we are running, detect it only once (per boot)
+    cached = DiscoveryCache.get("board")
+    if cached is not None:
+        try:
+            return BoardProfile.from_dict(cached)
+        except (KeyError, TypeError, ValueError):
+            pass
+    profile = detect_board_profile()
+    DiscoveryCache.set("board", profile.as_dict())
+    return profile
 
 
-def get_board():
-    if NvidiaJetson.is_instance_of():
+@functools.lru_cache(maxsize=1)
+def get_board() -> GenericMachine:
+    if get_board_profile().family is BoardFamily.NVIDIA_JETSON:
         return NvidiaJetson()
     return RaspberryPi()
 
 
 def board_has_gpu():
-    if NvidiaJetson.is_instance_of():
-        return True
-    return False
+    return get_board_profile().has(Capability.GPU)
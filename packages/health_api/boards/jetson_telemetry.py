@@ -0,0 +1,160 @@
+import glob
+import os
+from threading import Event
+from typing import Dict, Optional, Tuple
+
+from health_api import logger
+from health_api.constants import JETSON_TELEMETRY_RATE_HZ
+from health_api.knowledge_base import KnowledgeBase
+from health_api.tegrastats_api.parser import is_gpu_rail
+
+SYSFS_ROOT = "/sys"
+
+# GPU load files (relative to the sysfs root) across Jetson modules and L4T releases
+GPU_LOAD_FILES = [
+    # Nano, TX1, TX2, Xavier (L4T 32)
+    "devices/gpu.0/load",
+    "devices/platform/gpu.0/load",
+    # Xavier (L4T 35)
+    "devices/17000000.gv11b/load",
+    # Orin
+    "devices/17000000.ga10b/load",
+    "devices/platform/17000000.ga10b/load",
+]
+
+
+class JetsonTelemetry:
+    """
+    Reads GPU load, temperature and power of Nvidia Jetson boards straight from sysfs
+    (what `tegrastats` does), without spawning processes or parsing text.
+
+      - load:           /sys/devices/gpu.0/load or equivalent (per-mille), see GPU_LOAD_FILES
+      - temperature:    /sys/class/thermal/thermal_zone*/{type,temp} (milli-celsius)
+      - power:          INA3221 power monitor, either through hwmon (L4T >= 34)
+                        or through the iio driver (L4T 32)
+
+    The `root` of the tree can be replaced (e.g., with a fake sysfs tree for testing).
+    """
+
+    def __init__(self, root: str = SYSFS_ROOT, rate: float = JETSON_TELEMETRY_RATE_HZ):
+        self._root = root
+        self._period = 1.0 / max(rate, 0.01)
+        self._shutdown = Event()
+        # sysfs paths are resolved once
+        self._load_file: Optional[str] = self._find_gpu_load()
+        self._temperature_file: Optional[str] = self._find_gpu_thermal_zone()
+        self._power_files: Optional[Tuple[str, ...]] = self._find_gpu_power_rail()
+
+    @property
+    def available(self) -> bool:
+        return self._load_file is not None
+
+    def sample(self) -> Dict[str, float]:
+        sample = {}
+        if self._load_file:
+            load = self._read_int(self._load_file)
+            if load is not None:
+                sample["GPU_USAGE"] = load / 10.0
+        if self._temperature_file:
+            temp = self._read_int(self._temperature_file)
+            if temp is not None:
+                sample["GPU_TEMP"] = temp / 1000.0
+        if self._power_files:
+            power = self._read_power()
+            if power is not None:
+                sample["GPU_POWER"] = power
+        return sample
+
+    def publish(self):
+        # all the values of a sample become visible at once
+        sample = self.sample()
+        if sample:
+            KnowledgeBase.set_many(sample)
+
+    def run(self):
+        # blocks until shutdown() is called
+        while not self._shutdown.is_set():
+            # noinspection PyBroadException
+            try:
+                self.publish()
+            except Exception as e:
+                logger.warning(f"Could not read the GPU telemetry: {str(e)}")
+            self._shutdown.wait(self._period)
+
+    @property
+    def period(self) -> float:
+        return self._period
+
+    def shutdown(self):
+        self._shutdown.set()
+
+    def _find_gpu_load(self) -> Optional[str]:
+        for path in GPU_LOAD_FILES:
+            path = os.path.join(self._root, path)
+            if os.path.exists(path):
+                return path
+        # unknown module, the GPU is the devfreq device exposing its load
+        devices = glob.glob(os.path.join(self._root, "class", "devfreq", "*", "device"))
+        for device in sorted(devices):
+            path = os.path.join(device, "load")
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _find_gpu_thermal_zone(self) -> Optional[str]:
+        zones = glob.glob(os.path.join(self._root, "class", "thermal", "thermal_zone*"))
+        for zone in sorted(zones):
+            kind = self._read(os.path.join(zone, "type")) or ""
+            if kind.lower().startswith("gpu"):
+                return os.path.join(zone, "temp")
+        return None
+
+    def _find_gpu_power_rail(self) -> Optional[Tuple[str, ...]]:
+        # hwmon: in<N>_label, in<N>_input (mV), curr<N>_input (mA)
+        for hwmon in sorted(glob.glob(os.path.join(self._root, "class", "hwmon", "hwmon*"))):
+            if self._read(os.path.join(hwmon, "name")) != "ina3221":
+                continue
+            for label in sorted(glob.glob(os.path.join(hwmon, "in*_label"))):
+                if is_gpu_rail(self._read(label) or ""):
+                    channel = os.path.basename(label)[2:-len("_label")]
+                    return (os.path.join(hwmon, f"in{channel}_input"),
+                            os.path.join(hwmon, f"curr{channel}_input"))
+        # iio: rail_name_<N>, in_power<N>_input (mW)
+        pattern = os.path.join(self._root, "bus", "i2c", "drivers", "ina3221x", "*", "iio:device*")
+        for device in sorted(glob.glob(pattern)):
+            for rail in sorted(glob.glob(os.path.join(device, "rail_name_*"))):
+                if is_gpu_rail(self._read(rail) or ""):
+                    channel = rail.rsplit("_", 1)[-1]
+                    return (os.path.join(device, f"in_power{channel}_input"),)
+        return None
+
+    def _read_power(self) -> Optional[float]:
+        # returns watts
+        values = [self._read_int(f) for f in self._power_files]
+        if None in values:
+            return None
+        if len(values) == 1:
+            return values[0] / 1000.0
+        millivolts, milliamps = values
+        return millivolts * milliamps / 10 ** 6
+
+    @staticmethod
+    def _read(path: str) -> Optional[str]:
+        try:
+            with open(path, "rt") as fin:
+                return fin.read().strip()
+        except OSError:
+            return None
+
+    @classmethod
+    def _read_int(cls, path: str) -> Optional[int]:
+        value = cls._read(path)
+        try:
+            return int(value) if value is not None else None
+        except ValueError:
+            return None
+
+
+__all__ = [
+    'JetsonTelemetry'
+]
@@ -1,11 +1,12 @@
+import functools
 import os
-import subprocess
 from datetime import datetime
 from typing import Optional, List
 
 import jtop
 
 from health_api.constants import GB, GHz
+from health_api.executor import CommandExecutor
 from health_api.knowledge_base import KnowledgeBase
 from health_api.machine import GenericMachine, I2CBusDescriptor
 from health_api.memory_util import poll_meminfo
@@ -99,7 +100,7 @@ class NvidiaJetson(GenericMachine):
         cmd = f'. "{jtop_vars}" && env'
         # noinspection PyBroadException
         try:
-            env = subprocess.check_output(cmd, shell=True, stderr=subprocess.PIPE).decode('utf-8')
+            env = CommandExecutor.check_output(cmd, cache=True)
             env = {k[0]: k[1]
                    for k in map(lambda p: tuple(p.split('=', 1)), env.strip().split('\n'))}
         except BaseException:
@@ -134,12 +135,12 @@ class NvidiaJetson(GenericMachine):
 
     @classmethod
     def is_A02(cls):
-        carrier_board: str = cls._get_carrier_board()
+        carrier_board: str = cls.get_carrier_board()
         return cls.is_instance_of() and cls.is_4gb() and carrier_board == "A02"
 
     @classmethod
     def is_B01(cls):
-        carrier_board: str = cls._get_carrier_board()
+        carrier_board: str = cls.get_carrier_board()
         return cls.is_instance_of() and cls.is_4gb() and carrier_board == "B01"
 
     @classmethod
@@ -209,7 +210,8 @@ class NvidiaJetson(GenericMachine):
         return res
 
     @classmethod
-    def _get_carrier_board(cls) -> Optional[str]:
+    @functools.lru_cache(maxsize=1)
+    def get_carrier_board(cls) -> Optional[str]:
         i2cbuses: List[I2CBusDescriptor] = NvidiaJetson.get_i2c_buses()
         # find all i2c buses with "i2c-6-mux" in the name
         mux6: int = len(list(filter(lambda b: b.name.startswith("i2c-6-mux"), i2cbuses)))
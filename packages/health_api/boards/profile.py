@@ -0,0 +1,103 @@
+import dataclasses
+import os
+import shutil
+from enum import Enum
+from typing import Optional, FrozenSet, Dict
+
+from health_api import logger
+from .nvidia_jetson import NvidiaJetson
+from .raspberry_pi import RaspberryPi
+from .vcio import VCIO_DEVICE
+
+
+class BoardFamily(Enum):
+    RASPBERRY_PI = "Raspberry Pi"
+    NVIDIA_JETSON = "Nvidia Jetson"
+
+
+class Capability(Enum):
+    GPU = "gpu"
+    TEGRASTATS = "tegrastats"
+    VCGENCMD = "vcgencmd"
+    VCIO = "vcio"
+
+
+@dataclasses.dataclass(frozen=True)
+class BoardProfile:
+    """
+    Facts about the board that do not change while the device is running.
+    """
+    family: BoardFamily
+    model: str
+    revision: str
+    carrier_board: Optional[str]
+    thermal_zone: str
+    capabilities: FrozenSet[Capability]
+
+    def has(self, capability: Capability) -> bool:
+        return capability in self.capabilities
+
+    def as_dict(self) -> Dict:
+        return {
+            "family": self.family.value,
+            "model": self.model,
+            "revision": self.revision,
+            "carrier_board": self.carrier_board,
+            "thermal_zone": self.thermal_zone,
+            "capabilities": sorted(c.value for c in self.capabilities),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BoardProfile':
+        return BoardProfile(
+            family=BoardFamily(data["family"]),
+            model=data["model"],
+            revision=data["revision"],
+            carrier_board=data["carrier_board"],
+            thermal_zone=data["thermal_zone"],
+            capabilities=frozenset(Capability(c) for c in data["capabilities"]),
+        )
+
+
+def detect_board_profile() -> BoardProfile:
+    # Nvidia Jetson
+    if NvidiaJetson.is_instance_of():
+        hardware = NvidiaJetson.get_hardware()["hardware"]
+        carrier_board = None
+        if hardware["model"] == "Nano":
+            try:
+                carrier_board = NvidiaJetson.get_carrier_board()
+            except ValueError as e:
+                logger.warning(str(e))
+        return BoardProfile(
+            family=BoardFamily.NVIDIA_JETSON,
+            model=hardware["model"],
+            revision=hardware["revision"],
+            carrier_board=carrier_board,
+            thermal_zone=NvidiaJetson().get_cpu_thermal_zone_name(),
+            capabilities=frozenset({Capability.GPU, Capability.TEGRASTATS}),
+        )
+    # Raspberry Pi (default)
+    board = RaspberryPi()
+    hardware = board.get_hardware()["hardware"]
+    capabilities = set()
+    if os.path.exists(VCIO_DEVICE):
+        capabilities.add(Capability.VCIO)
+    if shutil.which(RaspberryPi.VC):
+        capabilities.add(Capability.VCGENCMD)
+    return BoardProfile(
+        family=BoardFamily.RASPBERRY_PI,
+        model=hardware["model"],
+        revision=hardware["revision"],
+        carrier_board=None,
+        thermal_zone=board.get_cpu_thermal_zone_name(),
+        capabilities=frozenset(capabilities),
+    )
+
+
+__all__ = [
+    'BoardFamily',
+    'BoardProfile',
+    'Capability',
+    'detect_board_profile'
+]
@@ -1,10 +1,14 @@
+import functools
 import re
-import subprocess
+from datetime import datetime
 
 from typing import Dict, Optional
 
+from health_api import logger
 from health_api.constants import MB, GB, MHz, GHz
+from health_api.executor import CommandExecutor
 from health_api.machine import GenericMachine
+from .vcio import get_mailbox, VOLTAGE_ID_CORE, VOLTAGE_ID_SDRAM_I
 
 
 class RaspberryPi(GenericMachine):
@@ -396,7 +400,19 @@ class RaspberryPi(GenericMachine):
     }
 
     def get_voltage(self):
-        # get Voltage
+        # get Voltage (from the VideoCore mailbox if available)
+        mailbox = get_mailbox()
+        if mailbox is not None:
+            try:
+                return {
+                    'volts': {
+                        'core': round(mailbox.get_voltage(VOLTAGE_ID_CORE), 4),
+                        'ram': round(mailbox.get_voltage(VOLTAGE_ID_SDRAM_I), 4),
+                    }
+                }
+            except OSError as e:
+                logger.warning(f"VideoCore mailbox: {str(e)}. Falling back to {self.VC}.")
+        # get Voltage (from vcgencmd)
         res = {
             'volts': {}
         }
@@ -414,9 +430,27 @@ class RaspberryPi(GenericMachine):
         return 'cpu_thermal'
 
     def get_firmware(self):
-        cmd = ' '.join([self.VC, 'version', '2>/dev/null', '||', 'echo', 'ND'])
-        res = subprocess.check_output(cmd, shell=True)
-        lines = res.decode('utf-8').split('\n')
+        # get firmware info (from the VideoCore mailbox if available)
+        mailbox = get_mailbox()
+        if mailbox is not None:
+            try:
+                date = datetime.utcfromtimestamp(mailbox.get_firmware_revision())
+                return {
+                    'firmware': {
+                        'date': {
+                            'day': date.day,
+                            'month': date.month,
+                            'year': date.year
+                        },
+                        'version': mailbox.get_firmware_hash()
+                    }
+                }
+            except OSError as e:
+                logger.warning(f"VideoCore mailbox: {str(e)}. Falling back to {self.VC}.")
+        # get firmware info (from vcgencmd)
+        # failures are tracked (and backed off) by the executor, the output is simply empty
+        res = CommandExecutor.run([self.VC, 'version']).result().output
+        lines = res.split('\n')
         res = {
             'date': {
                 'day': 0,
@@ -443,8 +477,7 @@ class RaspberryPi(GenericMachine):
         # get defaults
         res = {'hardware': self._default_hardware_info()}
         # get Raspberry Pi board model
-        cpuinfo = self._command_output(['cat', '/proc/cpuinfo'], 'Revision')
-        revision = cpuinfo['Revision']
+        revision = self.get_revision()
         if revision in self.MODELS:
             info = self.MODELS[revision]
             info['board'] = 'Raspberry Pi'
@@ -466,10 +499,9 @@ class RaspberryPi(GenericMachine):
             'status_msgs': []
         }
         # get throttled
-        throttled = self._command_output([self.VC, 'get_throttled'], 'throttled')['throttled']
-        if throttled != 'ND':
+        tint = self._get_throttled_value()
+        if tint is not None:
             # expand throttled
-            tint = int(throttled, 0)
             bits = {
                 'under-voltage-now': 0,
                 'freq-capped-now': 1,
@@ -516,17 +548,41 @@ class RaspberryPi(GenericMachine):
         # ---
         return res
 
+    def _get_throttled_value(self) -> Optional[int]:
+        # get throttled bits (from the VideoCore mailbox if available)
+        mailbox = get_mailbox()
+        if mailbox is not None:
+            try:
+                return mailbox.get_throttled()
+            except OSError as e:
+                logger.warning(f"VideoCore mailbox: {str(e)}. Falling back to {self.VC}.")
+        # get throttled bits (from vcgencmd)
+        throttled = self._command_output([self.VC, 'get_throttled'], 'throttled')['throttled']
+        return int(throttled, 0) if throttled != 'ND' else None
+
     @classmethod
     def is_instance_of(cls):
-        cpuinfo = cls._command_output(['cat', '/proc/cpuinfo'], 'Revision')
-        revision = cpuinfo['Revision']
-        return revision in cls.MODELS
+        return cls.get_revision() in cls.MODELS
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def get_revision() -> str:
+        # board revision code from /proc/cpuinfo
+        try:
+            with open('/proc/cpuinfo', 'rt') as fin:
+                for line in fin:
+                    key, _, value = line.partition(':')
+                    if key.strip() == 'Revision':
+                        return value.strip()
+        except OSError:
+            pass
+        return 'ND'
 
     @classmethod
-    def _command_output(cls, cmd, key, default='ND') -> Dict[str, Optional[str]]:
-        cmd = ' '.join(cmd + ['2>/dev/null', '||', 'echo', 'ND'])
-        res = subprocess.check_output(cmd, shell=True)
-        lines = res.decode('utf-8').split('\n')
+    def _command_output(cls, cmd, key, default='ND', cache=False) -> Dict[str, Optional[str]]:
+        # failures are tracked (and backed off) by the executor, we parse whatever we get
+        res = CommandExecutor.run(' '.join(cmd), cache=cache).result().output
+        lines = res.split('\n')
         res = {
             key: default
         }
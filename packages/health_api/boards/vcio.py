@@ -0,0 +1,120 @@
+import array
+import fcntl
+import os
+import struct
+from threading import Lock
+from typing import Callable, List, Optional
+
+VCIO_DEVICE = "/dev/vcio"
+
+# _IOWR(100, 0, char *), as defined by the vcio driver
+IOCTL_MBOX_PROPERTY = (3 << 30) | (struct.calcsize('P') << 16) | (100 << 8) | 0
+
+# mailbox property interface, see:
+#   https://github.com/raspberrypi/firmware/wiki/Mailbox-property-interface
+PROCESS_REQUEST = 0x00000000
+REQUEST_SUCCESSFUL = 0x80000000
+END_TAG = 0x00000000
+
+TAG_GET_FIRMWARE_REVISION = 0x00000001
+TAG_GET_FIRMWARE_HASH = 0x00000022
+TAG_GET_VOLTAGE = 0x00030003
+TAG_GET_THROTTLED = 0x00030046
+
+VOLTAGE_ID_CORE = 0x00000001
+VOLTAGE_ID_SDRAM_C = 0x00000002
+VOLTAGE_ID_SDRAM_P = 0x00000003
+VOLTAGE_ID_SDRAM_I = 0x00000004
+
+
+class VCMailbox:
+    """
+    Talks to the VideoCore firmware through the mailbox property interface exposed by
+    /dev/vcio, without spawning `vcgencmd`.
+
+    The device is opened once and the file descriptor is reused for all requests.
+    Both `ioctl` and `opener` can be replaced (e.g., with fakes for testing).
+    """
+
+    def __init__(self, device: str = VCIO_DEVICE, ioctl: Callable = fcntl.ioctl,
+                 opener: Callable[[str], int] = lambda path: os.open(path, os.O_RDWR)):
+        self._device = device
+        self._ioctl = ioctl
+        self._opener = opener
+        self._fd: Optional[int] = None
+        # the process that opened the device, children of a fork open their own
+        self._pid: Optional[int] = None
+        self._lock = Lock()
+
+    def property(self, tag: int, values: List[int], response_size: int) -> List[int]:
+        """
+        Sends a single-tag request and returns the first `response_size` words of the response.
+        """
+        size = max(len(values), response_size)
+        # header (2) + tag header (3) + value buffer (size) + end tag (1)
+        buf = array.array('I', [0] * (6 + size))
+        buf[0] = len(buf) * buf.itemsize
+        buf[1] = PROCESS_REQUEST
+        buf[2] = tag
+        buf[3] = size * buf.itemsize
+        buf[4] = 0
+        buf[5:5 + len(values)] = array.array('I', values)
+        buf[-1] = END_TAG
+        with self._lock:
+            self._ioctl(self._open(), IOCTL_MBOX_PROPERTY, buf, True)
+        if buf[1] != REQUEST_SUCCESSFUL:
+            raise OSError(f"Mailbox request for tag 0x{tag:08x} failed with code 0x{buf[1]:08x}")
+        if not buf[4] & REQUEST_SUCCESSFUL:
+            raise OSError(f"Mailbox tag 0x{tag:08x} was not processed")
+        return list(buf[5:5 + response_size])
+
+    def get_throttled(self) -> int:
+        # a zero mask does not clear the sticky bits (same as `vcgencmd get_throttled`)
+        return self.property(TAG_GET_THROTTLED, [0], 1)[0]
+
+    def get_voltage(self, voltage_id: int) -> float:
+        # the firmware answers with (id, micro-volts)
+        _, value = self.property(TAG_GET_VOLTAGE, [voltage_id], 2)
+        return value / 10 ** 6
+
+    def get_firmware_revision(self) -> int:
+        # build time of the firmware (unix timestamp)
+        return self.property(TAG_GET_FIRMWARE_REVISION, [], 1)[0]
+
+    def get_firmware_hash(self) -> str:
+        # git hash of the firmware (same as `vcgencmd version`)
+        words = self.property(TAG_GET_FIRMWARE_HASH, [], 5)
+        return ''.join(f'{w:08x}' for w in words)
+
+    def close(self):
+        with self._lock:
+            if self._fd is not None and self._pid == os.getpid():
+                os.close(self._fd)
+            self._fd = None
+
+    def _open(self) -> int:
+        if self._fd is None or self._pid != os.getpid():
+            self._fd = self._opener(self._device)
+            self._pid = os.getpid()
+        return self._fd
+
+
+__mailbox__: Optional[VCMailbox] = None
+
+
+def get_mailbox() -> Optional[VCMailbox]:
+    # returns None when the device is not available (e.g., not a Raspberry Pi)
+    global __mailbox__
+    if __mailbox__ is None and os.path.exists(VCIO_DEVICE):
+        __mailbox__ = VCMailbox()
+    return __mailbox__
+
+
+__all__ = [
+    'VCMailbox',
+    'get_mailbox',
+    'VOLTAGE_ID_CORE',
+    'VOLTAGE_ID_SDRAM_C',
+    'VOLTAGE_ID_SDRAM_P',
+    'VOLTAGE_ID_SDRAM_I'
+]
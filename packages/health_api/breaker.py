@@ -0,0 +1,158 @@
+import time
+from enum import Enum
+from threading import Lock
+from typing import Dict, Optional, Tuple
+
+from health_api.constants import BREAKER_FAILURE_THRESHOLD, BREAKER_BASE_BACKOFF_SECS, \
+    BREAKER_MAX_BACKOFF_SECS, BREAKER_TRIAL_TIMEOUT_SECS
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+# the state of a breaker as a plain tuple, it can be sent to (and back from) a worker process
+Snapshot = Tuple[str, int, int, float, Optional[str]]
+
+
+class BreakerState(Enum):
+    # calls go through
+    CLOSED = "closed"
+    # calls are refused until the backoff expires
+    OPEN = "open"
+    # a single trial call is in progress
+    HALF_OPEN = "half-open"
+
+
+class CircuitBreaker:
+    """
+    Tracks the failures of a source (a collector, a command, a file) and stops calling it
+    once it keeps failing. The circuit opens after `threshold` consecutive failures, and is
+    tried again after a backoff that doubles every time the trial fails (up to `max_backoff`).
+    Callers must report the outcome of every call they were allowed to make, a trial that
+    does not report back within `trial_timeout` is replaced by a new one.
+    """
+
+    def __init__(self, name: str, threshold: int = BREAKER_FAILURE_THRESHOLD,
+                 base_backoff: float = BREAKER_BASE_BACKOFF_SECS,
+                 max_backoff: float = BREAKER_MAX_BACKOFF_SECS,
+                 trial_timeout: float = BREAKER_TRIAL_TIMEOUT_SECS):
+        self.name = name
+        self._threshold = max(1, threshold)
+        self._base_backoff = base_backoff
+        self._max_backoff = max_backoff
+        self._trial_timeout = trial_timeout
+        self._state = BreakerState.CLOSED
+        self._failures = 0
+        self._trips = 0
+        self._retry_time = 0.0
+        self._last_error: Optional[str] = None
+        self._lock = Lock()
+
+    @property
+    def state(self) -> BreakerState:
+        return self._state
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return self._last_error
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._state is BreakerState.CLOSED:
+                return True
+            if time.monotonic() < self._retry_time:
+                return False
+            # let a single call through, it decides whether we close again; the retry time
+            # becomes the deadline of the trial, in case its outcome is never reported
+            self._state = BreakerState.HALF_OPEN
+            self._retry_time = time.monotonic() + self._trial_timeout
+            return True
+
+    def success(self):
+        with self._lock:
+            self._state = BreakerState.CLOSED
+            self._failures = 0
+            self._trips = 0
+
+    def failure(self, error: Optional[str] = None) -> bool:
+        # returns True on the first failure of a streak (e.g., to log it only once)
+        with self._lock:
+            self._failures += 1
+            self._last_error = error
+            if self._state is BreakerState.HALF_OPEN or self._failures >= self._threshold:
+                backoff = min(self._max_backoff, self._base_backoff * 2 ** self._trips)
+                self._trips += 1
+                self._state = BreakerState.OPEN
+                self._retry_time = time.monotonic() + backoff
+            return self._failures == 1
+
+    def check(self):
+        # raises CircuitOpen if calls are not allowed right now
+        if not self.allow():
+            raise CircuitOpen(f"'{self.name}' is failing, not trying again for "
+                              f"{max(0.0, self._retry_time - time.monotonic()):.0f} seconds. "
+                              f"Last error: {self._last_error}")
+
+    def snapshot(self) -> Snapshot:
+        with self._lock:
+            return self._state.value, self._failures, self._trips, self._retry_time, \
+                self._last_error
+
+    def restore(self, snapshot: Snapshot):
+        with self._lock:
+            state, self._failures, self._trips, self._retry_time, self._last_error = snapshot
+            self._state = BreakerState(state)
+
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "state": self._state.value,
+                "failures": self._failures,
+                "trips": self._trips,
+                "retry_in": max(0.0, self._retry_time - time.monotonic())
+                if self._state is BreakerState.OPEN else 0.0,
+                "last_error": self._last_error,
+            }
+
+
+class _CircuitBreakers:
+    """
+    Registry of the circuit breakers, one per source.
+    """
+
+    def __init__(self):
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        breaker = self._breakers.get(name, None)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.setdefault(name, CircuitBreaker(name))
+        return breaker
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.as_dict() for name, breaker in sorted(breakers.items())}
+
+    def snapshot(self) -> Dict[str, Snapshot]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.snapshot() for name, breaker in breakers.items()}
+
+    def restore(self, snapshots: Dict[str, Snapshot]):
+        # used to keep the breakers of the worker processes in sync with ours
+        for name, snapshot in snapshots.items():
+            self.get(name).restore(snapshot)
+
+
+CircuitBreakers = _CircuitBreakers()
+
+__all__ = [
+    'CircuitBreakers',
+    'CircuitBreaker',
+    'CircuitOpen',
+    'BreakerState'
+]
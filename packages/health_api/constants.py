@@ -8,6 +8,80 @@ GB = 10 ** 9
 HEALTH_API_PORT = 8085
 HEALTH_WATCHDOG_FREQUENZY_HZ = 0.5
 
+# fraction of a resource's TTL used to randomize its refresh period
+RESOURCE_SCHEDULER_JITTER = 0.2
+
+# upper bound to the time a long-poll request (?wait=<seconds>) can be held
+LONG_POLL_MAX_WAIT_SECS = 60
+
+# idle (keep-alive) connections are closed after this many seconds (production server only);
+# this is not a per-request deadline, long requests are bounded by LONG_POLL_MAX_WAIT_SECS
+# and COLLECTOR_TIMEOUT_SECS instead
+HEALTH_API_IDLE_TIMEOUT_SECS = 30
+# maximum number of simultaneous connections (production server only)
+HEALTH_API_MAX_CONNECTIONS = 100
+
+# pool of helper shells running external commands
+COMMAND_EXECUTOR_WORKERS = 2
+COMMAND_TIMEOUT_SECS = 10
+
+# independent I2C buses scanned in parallel
+I2C_SCANNER_WORKERS = 4
+
+# components are probed again periodically, a few at a time
+COMPONENTS_REDETECTION_PERIOD_SECS = 5
+COMPONENTS_REDETECTION_SLICE = 4
+# number of component change events (added/removed) kept in the 'components' resource
+COMPONENTS_MAX_EVENTS = 32
+
+# pool of worker processes running the collectors that talk to the hardware
+COLLECTOR_WORKERS = 2
+COLLECTOR_TIMEOUT_SECS = 5
+
+# circuit breakers: failing sources are skipped after a few failures, then tried again
+# with an exponential backoff
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_BASE_BACKOFF_SECS = 10
+BREAKER_MAX_BACKOFF_SECS = 600
+# a trial call that did not report back within this time is considered lost
+BREAKER_TRIAL_TIMEOUT_SECS = 60
+
+# hardware discovery results are reused across restarts within the same boot
+DISCOVERY_CACHE_FILE = "/data/cache/device-health/discovery.json"
+BOOT_ID_FILE = "/proc/sys/kernel/random/boot_id"
+
 DISK_IMAGE_STATS_FILE = "/data/stats/disk_image/build.json"
 
 DEBUG = os.environ.get('DEBUG', '0').lower() in ['1', 'yes', 'true']
+
+# serve expired resources right away and refresh them in the background
+STALE_WHILE_REVALIDATE = \
+    os.environ.get('STALE_WHILE_REVALIDATE', '0').lower() in ['1', 'yes', 'true']
+
+# use a production-grade WSGI server instead of the development server shipped with Flask
+HEALTH_API_PRODUCTION_SERVER = \
+    os.environ.get('HEALTH_API_PRODUCTION_SERVER', '0').lower() in ['1', 'yes', 'true']
+# size of the pool of workers serving HTTP requests (production server and asyncio runtime)
+HEALTH_API_WORKERS = int(os.environ.get('HEALTH_API_WORKERS', '8'))
+
+# host collectors and API on a single asyncio event loop instead of a thread each
+HEALTH_API_ASYNCIO = os.environ.get('HEALTH_API_ASYNCIO', '0').lower() in ['1', 'yes', 'true']
+# size of the pool of workers running blocking collectors (asyncio runtime only)
+ASYNC_RUNTIME_WORKERS = 2
+
+# server-side limits for the clients of the /stream endpoint, streams hold a worker each
+STREAM_MAX_SUBSCRIBERS = max(1, HEALTH_API_WORKERS // 2)
+STREAM_MIN_INTERVAL_SECS = 0.5
+STREAM_HEARTBEAT_SECS = 15
+
+# only probe the I2C addresses declared by the robot's components
+I2C_SCAN_TARGETED = os.environ.get('I2C_SCAN_TARGETED', '1').lower() in ['1', 'yes', 'true']
+
+# run the collectors that talk to the hardware in supervised worker processes
+COLLECTOR_ISOLATION = os.environ.get('COLLECTOR_ISOLATION', '1').lower() in ['1', 'yes', 'true']
+
+# sampling rate of the GPU telemetry of Nvidia Jetson boards (read from sysfs)
+JETSON_TELEMETRY_RATE_HZ = float(os.environ.get('JETSON_TELEMETRY_RATE_HZ', '2'))
+
+# sampling interval of tegrastats (Nvidia Jetson boards)
+TEGRASTATS_INTERVAL_MS = int(os.environ.get('TEGRASTATS_INTERVAL_MS', '1000'))
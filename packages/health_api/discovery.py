@@ -0,0 +1,110 @@
+import json
+import os
+from threading import Lock
+from typing import Any, Dict, Optional
+
+from health_api import logger
+from health_api.constants import DISCOVERY_CACHE_FILE, BOOT_ID_FILE
+
+
+class _DiscoveryCache:
+    """
+    Results of hardware discovery (board, I2C detections, USB devices, components) persisted
+    on disk so that restarts of the container within the same boot can skip the (slow)
+    detection steps. The cache is keyed by the boot ID and the robot configuration, anything
+    stored for a different key is ignored and overwritten.
+    """
+
+    def __init__(self, path: str = DISCOVERY_CACHE_FILE, boot_id_file: str = BOOT_ID_FILE,
+                 configuration: Optional[str] = None):
+        self._path = path
+        self._boot_id_file = boot_id_file
+        self._configuration = configuration
+        self._sections: Optional[Dict[str, Any]] = None
+        self._lock = Lock()
+
+    @property
+    def key(self) -> Optional[str]:
+        boot_id = self._boot_id()
+        # without a boot ID we cannot tell when the results become invalid
+        if boot_id is None:
+            return None
+        configuration = self._configuration
+        if configuration is None:
+            configuration = os.environ.get("ROBOT_CONFIGURATION", "")
+        return f"{boot_id}/{configuration}"
+
+    def get(self, section: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._load().get(section, default)
+
+    def set(self, section: str, value: Any):
+        with self._lock:
+            self._load()[section] = value
+            self._store()
+
+    def update(self, section: str, key: str, value: Any):
+        # sets a single key within a section (e.g., the detections of one I2C bus)
+        with self._lock:
+            self._load().setdefault(section, {})[key] = value
+            self._store()
+
+    def clear(self):
+        with self._lock:
+            self._sections = {}
+            try:
+                os.remove(self._path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not remove the discovery cache '{self._path}': {str(e)}")
+
+    def _load(self) -> Dict[str, Any]:
+        if self._sections is not None:
+            return self._sections
+        self._sections = {}
+        if self.key is None:
+            return self._sections
+        try:
+            with open(self._path, "rt") as fin:
+                content = json.load(fin)
+        except FileNotFoundError:
+            return self._sections
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not read the discovery cache '{self._path}': {str(e)}")
+            return self._sections
+        # results from a different boot (or robot configuration) are not valid anymore
+        if isinstance(content, dict) and content.get("key", None) == self.key:
+            self._sections = content.get("sections", {})
+            logger.info(f"Using the hardware discovery results cached in '{self._path}'.")
+        return self._sections
+
+    def _store(self):
+        key = self.key
+        if key is None:
+            return
+        content = {"key": key, "sections": self._sections}
+        tmp = f"{self._path}.tmp"
+        try:
+            os.makedirs(os.path.dirname(self._path), exist_ok=True)
+            with open(tmp, "wt") as fout:
+                json.dump(content, fout, indent=2, sort_keys=True)
+            # atomic, readers never see a partial file
+            os.replace(tmp, self._path)
+        except OSError as e:
+            # not fatal, we only lose the cache
+            logger.warning(f"Could not write the discovery cache '{self._path}': {str(e)}")
+
+    def _boot_id(self) -> Optional[str]:
+        try:
+            with open(self._boot_id_file, "rt") as fin:
+                return fin.read().strip() or None
+        except OSError:
+            return None
+
+
+DiscoveryCache = _DiscoveryCache()
+
+__all__ = [
+    'DiscoveryCache'
+]
@@ -0,0 +1,224 @@
+import collections
+import dataclasses
+import os
+import shlex
+import signal
+import subprocess
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Queue, Empty
+from threading import Lock, Timer
+from typing import Union, List, Dict, Deque
+
+from health_api.breaker import CircuitBreakers, CircuitBreaker, CircuitOpen
+from health_api.constants import COMMAND_EXECUTOR_WORKERS, COMMAND_TIMEOUT_SECS
+
+Command = Union[str, List[str]]
+
+
+@dataclasses.dataclass(frozen=True)
+class CommandResult:
+    command: str
+    returncode: int
+    output: str
+    duration: float
+
+
+class _Shell:
+    """
+    A long-lived `/bin/sh` that runs one command at a time, output is delimited by markers.
+    """
+
+    def __init__(self):
+        self._process = subprocess.Popen(
+            ['/bin/sh'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0,
+            # the helper and its children form a group we can kill at once
+            start_new_session=True
+        )
+        self.killed = False
+
+    @property
+    def alive(self) -> bool:
+        return not self.killed and self._process.poll() is None
+
+    def run(self, command: str) -> (int, bytes):
+        marker = uuid.uuid4().hex.encode('ascii')
+        # commands cannot read from our stdin, the extra new line makes sure the marker is
+        # always at the beginning of a line
+        script = b"( %s ) </dev/null 2>/dev/null; printf '\\n%s %%d\\n' $?\n" % \
+            (command.encode('utf-8'), marker)
+        self._process.stdin.write(script)
+        self._process.stdin.flush()
+        lines = []
+        while True:
+            line = self._process.stdout.readline()
+            if not line:
+                raise BrokenPipeError("The helper shell terminated unexpectedly.")
+            if line.startswith(marker + b' '):
+                returncode = int(line[len(marker) + 1:])
+                break
+            lines.append(line)
+        # drop the new line we added before the marker
+        output = b''.join(lines)[:-1]
+        return returncode, output
+
+    def kill(self):
+        self.killed = True
+        try:
+            os.killpg(self._process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        self._process.wait()
+
+
+class _CommandExecutor:
+    """
+    Runs shell commands on a small pool of long-lived helper shells instead of spawning a
+    new shell for every call. Results are returned through futures, commands that run
+    longer than their timeout get their helper killed (and replaced).
+    Outputs of idempotent commands can be cached for the lifetime of the process
+    (i.e., per boot).
+    """
+
+    def __init__(self, workers: int = COMMAND_EXECUTOR_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="command")
+        self._shells: Queue = Queue()
+        self._cache: Dict[str, CommandResult] = {}
+        self._failures: Dict[str, Union[CommandResult, BaseException]] = {}
+        self._lock = Lock()
+        # stats
+        self._spawns = 0
+        self._commands = 0
+        self._cache_hits = 0
+        self._timeouts = 0
+        self._short_circuits = 0
+        self._latencies: Deque[float] = collections.deque(maxlen=256)
+
+    def run(self, command: Command, timeout: float = COMMAND_TIMEOUT_SECS,
+            cache: bool = False) -> 'Future[CommandResult]':
+        command = command if isinstance(command, str) else shlex.join(command)
+        if cache:
+            result = self._cache.get(command, None)
+            if result is not None:
+                with self._lock:
+                    self._cache_hits += 1
+                future = Future()
+                future.set_result(result)
+                return future
+        # commands that keep failing are not run again until their breaker lets us
+        breaker = CircuitBreakers.get(f"command/{command}")
+        if not breaker.allow():
+            with self._lock:
+                self._short_circuits += 1
+            future = Future()
+            # the breaker might come from another process (see health_api.worker)
+            failure = self._failures.get(command, None) or CircuitOpen(
+                f"'{command}' is failing, last error: {breaker.last_error}")
+            if isinstance(failure, BaseException):
+                future.set_exception(failure)
+            else:
+                future.set_result(failure)
+            return future
+        return self._pool.submit(self._execute, command, timeout, cache, breaker)
+
+    def check_output(self, command: Command, timeout: float = COMMAND_TIMEOUT_SECS,
+                     cache: bool = False) -> str:
+        # same semantics as subprocess.check_output (with text=True)
+        result = self.run(command, timeout, cache).result()
+        if result.returncode != 0:
+            raise subprocess.CalledProcessError(result.returncode, result.command, result.output)
+        return result.output
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "spawns": self._spawns,
+                "commands": self._commands,
+                "cache_hits": self._cache_hits,
+                "timeouts": self._timeouts,
+                "short_circuits": self._short_circuits,
+                "latency": {
+                    "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                    "p50": self._percentile(latencies, 0.5),
+                    "p99": self._percentile(latencies, 0.99),
+                    "max": latencies[-1] if latencies else 0.0,
+                }
+            }
+
+    def _execute(self, command: str, timeout: float, cache: bool,
+                 breaker: CircuitBreaker) -> CommandResult:
+        # every outcome is reported to the breaker, it might be waiting on this trial
+        try:
+            result = self._run(command, timeout)
+        except BaseException as e:
+            self._failures[command] = e
+            breaker.failure(str(e))
+            raise
+        if result.returncode == 0:
+            breaker.success()
+            if cache:
+                self._cache[command] = result
+        else:
+            # the last failure is returned (without running the command) while the breaker is open
+            self._failures[command] = result
+            breaker.failure(f"exit code {result.returncode}")
+        return result
+
+    def _run(self, command: str, timeout: float) -> CommandResult:
+        shell = self._shell()
+        # kill the helper if the command takes too long, this unblocks the reader
+        watchdog = Timer(timeout, shell.kill)
+        watchdog.daemon = True
+        stime = time.monotonic()
+        watchdog.start()
+        try:
+            returncode, output = shell.run(command)
+        except (BrokenPipeError, ValueError, OSError):
+            if shell.killed:
+                with self._lock:
+                    self._timeouts += 1
+                raise subprocess.TimeoutExpired(command, timeout)
+            raise
+        finally:
+            watchdog.cancel()
+            # only healthy helpers go back to the pool
+            if shell.alive:
+                self._shells.put(shell)
+        duration = time.monotonic() - stime
+        result = CommandResult(command, returncode, output.decode('utf-8', 'ignore'), duration)
+        with self._lock:
+            self._commands += 1
+            self._latencies.append(duration)
+        return result
+
+    def _shell(self) -> _Shell:
+        while True:
+            try:
+                shell = self._shells.get_nowait()
+            except Empty:
+                break
+            if shell.alive:
+                return shell
+        with self._lock:
+            self._spawns += 1
+        return _Shell()
+
+    @staticmethod
+    def _percentile(values: List[float], q: float) -> float:
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+CommandExecutor = _CommandExecutor()
+
+__all__ = [
+    'CommandExecutor',
+    'CommandResult'
+]
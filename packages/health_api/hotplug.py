@@ -0,0 +1,164 @@
+import dataclasses
+import os
+import select
+import socket
+from threading import Thread, Lock
+from typing import Dict, Callable, List, Optional, Tuple
+
+from health_api import logger
+
+# from linux/netlink.h
+NETLINK_KOBJECT_UEVENT = 15
+# multicast group of the events sent by the kernel (udev re-broadcasts on group 2)
+UEVENT_KERNEL_GROUP = 1
+UEVENT_BUFFER_SIZE = 64 * 1024
+
+
+@dataclasses.dataclass(frozen=True)
+class UEvent:
+    action: str
+    devpath: str
+    properties: Dict[str, str]
+
+    @property
+    def subsystem(self) -> str:
+        return self.properties.get("SUBSYSTEM", "")
+
+    @property
+    def devname(self) -> str:
+        return self.properties.get("DEVNAME", "")
+
+    @property
+    def usb_id(self) -> Optional[Tuple[int, int]]:
+        # (vendor, product) of USB devices, e.g., PRODUCT=4d8/ecb7/100
+        product = self.properties.get("PRODUCT", None)
+        if product is None:
+            return None
+        try:
+            vid, pid, *_ = product.split("/")
+            return int(vid, 16), int(pid, 16)
+        except ValueError:
+            return None
+
+    @classmethod
+    def parse(cls, message: bytes) -> Optional['UEvent']:
+        # kernel format: "<action>@<devpath>\0KEY=VALUE\0KEY=VALUE\0..."
+        header, *fields = message.decode("utf-8", "ignore").split("\0")
+        if "@" not in header:
+            return None
+        action, devpath = header.split("@", 1)
+        properties = dict(f.split("=", 1) for f in fields if "=" in f)
+        return UEvent(action=action, devpath=devpath, properties=properties)
+
+
+def _netlink_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+    sock.bind((0, UEVENT_KERNEL_GROUP))
+    return sock
+
+
+class HotplugWatcher:
+    """
+    Listens for the uevents the kernel emits when devices appear or disappear and dispatches
+    them to the subscribers, so that nobody needs to poll for devices.
+
+    Events are read either by a thread of its own (start) or, when running on an event loop,
+    by the loop itself (see fileno and dispatch).
+    """
+
+    def __init__(self, socket_factory: Callable[[], socket.socket] = _netlink_socket):
+        self._socket_factory = socket_factory
+        self._socket: Optional[socket.socket] = None
+        self._subscribers: List[Tuple[Callable[[UEvent], bool], Callable[[UEvent], None]]] = []
+        self._lock = Lock()
+        self._is_shutdown = False
+        # wakes up the worker on shutdown
+        self._wakeup_r, self._wakeup_w = os.pipe()
+        self._worker = Thread(target=self._work, name="hotplug", daemon=True)
+
+    @property
+    def available(self) -> bool:
+        return self._socket is not None
+
+    def open(self) -> bool:
+        # returns False if uevents are not available (e.g., no access to the host's netlink)
+        try:
+            self._socket = self._socket_factory()
+        except OSError as e:
+            logger.warning(f"Hot-plug events not available: {str(e)}. Falling back to polling.")
+            return False
+        return True
+
+    def fileno(self) -> int:
+        return self._socket.fileno()
+
+    def subscribe(self, callback: Callable[[UEvent], None],
+                  match: Callable[[UEvent], bool] = lambda _: True):
+        with self._lock:
+            self._subscribers.append((match, callback))
+
+    def dispatch(self):
+        # reads a single event (blocking) and hands it to the interested subscribers
+        event = self.read()
+        if event is not None:
+            self.notify(event)
+
+    def read(self) -> Optional[UEvent]:
+        return UEvent.parse(self._socket.recv(UEVENT_BUFFER_SIZE))
+
+    def notify(self, event: UEvent):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for match, callback in subscribers:
+            if not match(event):
+                continue
+            # noinspection PyBroadException
+            try:
+                callback(event)
+            except BaseException as e:
+                logger.error(f"Hot-plug subscriber failed with error: {str(e)}")
+
+    def start(self):
+        if self.available:
+            self._worker.start()
+
+    def join(self):
+        if self._worker.is_alive():
+            self._worker.join()
+
+    def is_shutdown(self):
+        return self._is_shutdown
+
+    def shutdown(self):
+        self._is_shutdown = True
+        os.write(self._wakeup_w, b"\0")
+        self.join()
+        if self._socket is not None:
+            self._socket.close()
+
+    def _work(self):
+        while not self._is_shutdown:
+            readable, _, _ = select.select([self._socket, self._wakeup_r], [], [])
+            if self._socket in readable and not self._is_shutdown:
+                self.dispatch()
+
+
+def is_usb_device(event: UEvent) -> bool:
+    return event.subsystem == "usb" and event.properties.get("DEVTYPE", "") == "usb_device"
+
+
+def is_serial_acm(event: UEvent) -> bool:
+    return event.subsystem == "tty" and event.devname.startswith("ttyACM")
+
+
+def is_video_device(event: UEvent) -> bool:
+    return event.subsystem == "video4linux"
+
+
+__all__ = [
+    'HotplugWatcher',
+    'UEvent',
+    'is_usb_device',
+    'is_serial_acm',
+    'is_video_device'
+]
@@ -1,6 +1,11 @@
+import dataclasses
+import hashlib
+import heapq
+import json
+import math
 import time
-from collections import defaultdict
-from typing import Iterator, Tuple, Any, Union
+from threading import Lock, Condition
+from typing import Iterator, Tuple, Any, Union, Dict, List, Callable, Optional, Iterable
 
 
 class NotSet:
@@ -8,54 +13,277 @@ class NotSet:
 
 
 DEFAULT_TTL = 10
+# expired entries are kept around (as stale values) for this long before being evicted
+DEFAULT_STALE_GRACE = 60
+# keys created at runtime, these are bounded in number and evicted in LRU order (unless they
+# never expire, e.g., pending triggers)
+DYNAMIC_KEYS_PREFIXES = ('trigger/', 'GPU_')
+MAX_DYNAMIC_KEYS = 128
 
 
-class _KnowledgeBase(dict):
+@dataclasses.dataclass(frozen=True)
+class Entry:
+    value: Any
+    ttl: float
+    update_time: float
+    # incremented (globally) every time the content of the entry changes
+    version: int
+    # wall-clock time of the last change of content
+    modified_time: float = 0.0
+    # JSON encoding of the value, computed once when the value is published
+    encoded: Optional[bytes] = None
+    # hash of the encoded value
+    digest: Optional[str] = None
 
-    def __init__(self):
-        super().__init__()
-        # everything will be cached for 10 seconds by default
-        self._ttl = defaultdict(lambda: DEFAULT_TTL)
-        self._update_time = {}
+    @property
+    def expiration_time(self) -> float:
+        return self.update_time + self.ttl if self.ttl >= 0 else math.inf
+
+
+@dataclasses.dataclass(frozen=True)
+class Snapshot:
+    version: int
+    data: Dict[str, Any]
+
+
+class _KnowledgeBase:
+    """
+    Copy-on-write key-value store with expiration.
+
+    Writers are serialized and publish a brand new table of (immutable) entries with a single
+    reference swap, readers never lock and always see a consistent version of the table.
+    Times are measured on the monotonic clock, so wall-clock jumps (e.g., NTP) do not affect
+    expiration. Expired entries are evicted proactively (after a grace period during which
+    they are still available as stale values) using a min-heap of deadlines.
+    """
+
+    def __init__(self, stale_grace: float = DEFAULT_STALE_GRACE,
+                 max_dynamic_keys: int = MAX_DYNAMIC_KEYS):
+        self._entries: Dict[str, Entry] = {}
+        self._version: int = 0
+        self._lock = Lock()
+        # notified (under the writers' lock) every time the version moves
+        self._changed = Condition(self._lock)
+        self._stale_grace = stale_grace
+        self._max_dynamic_keys = max_dynamic_keys
+        # min-heap of (eviction time, version, key)
+        self._deadlines: List[Tuple[float, int, str]] = []
+        # last access time of the dynamic keys
+        self._last_access: Dict[str, float] = {}
+        self._expire_callbacks: List[Callable[[str, Any], None]] = []
+
+    @property
+    def version(self) -> int:
+        return self._version
 
     def get(self, key: str = None, default: Any = NotSet) -> Union[Iterator[Tuple[str, Any]], Any]:
-        if not self.has(key):
+        entry = self._entries.get(key, None)
+        if entry is None or self._expired(entry):
+            if default != NotSet:
+                return default
+            else:
+                raise KeyError(key)
+        self._touch(key)
+        return entry.value
+
+    def get_entry(self, key: str, stale: bool = False) -> Optional[Entry]:
+        entry = self._entries.get(key, None)
+        if entry is None or (not stale and self._expired(entry)):
+            return None
+        self._touch(key)
+        return entry
+
+    def get_stale(self, key: str, default: Any = NotSet) -> Any:
+        # same as get() but expired values are returned as well
+        entry = self._entries.get(key, None)
+        if entry is None:
             if default != NotSet:
                 return default
             else:
                 raise KeyError(key)
-        return self[key]
+        self._touch(key)
+        return entry.value
 
-    def set(self, key: str, value: Any, ttl: int = DEFAULT_TTL):
-        self[key] = value
-        self._update_time[key] = time.time()
-        self._ttl[key] = ttl
+    def set(self, key: str, value: Any, ttl: float = DEFAULT_TTL):
+        self.set_many({key: value}, ttl)
+
+    def set_many(self, values: Dict[str, Any], ttl: float = DEFAULT_TTL,
+                 ttls: Optional[Dict[str, float]] = None):
+        """
+        Sets multiple keys at once, readers see either none or all of the new values.
+        Keys in `ttls` get their own TTL instead of `ttl`.
+        """
+        encoded = {key: self._encode(value) for key, value in values.items()}
+        digests = {
+            key: hashlib.blake2b(enc, digest_size=16).hexdigest() if enc else None
+            for key, enc in encoded.items()
+        }
+        with self._lock:
+            entries = dict(self._entries)
+            version = self._version + 1
+            changed = False
+            now = time.monotonic()
+            for key, value in values.items():
+                digest = digests[key]
+                previous = entries.get(key, None)
+                key_changed = previous is None or \
+                    (previous.digest != digest if digest else previous.value != value)
+                # the version only moves when the content changes
+                if key_changed:
+                    changed = True
+                    key_version, modified_time = version, time.time()
+                else:
+                    key_version, modified_time = previous.version, previous.modified_time
+                key_ttl = ttls.get(key, ttl) if ttls else ttl
+                entry = Entry(value=value, ttl=key_ttl, update_time=now, version=key_version,
+                              modified_time=modified_time, encoded=encoded[key], digest=digest)
+                entries[key] = entry
+                if entry.ttl >= 0:
+                    deadline = entry.expiration_time + self._stale_grace
+                    heapq.heappush(self._deadlines, (deadline, key_version, key))
+                if self._is_dynamic(key) and entry.ttl >= 0:
+                    self._last_access[key] = entry.update_time
+                else:
+                    self._last_access.pop(key, None)
+            # evictions are changes too, readers must not keep serving what was dropped
+            if self._evict_lru(entries):
+                changed = True
+            # publish the new table first, then the version, readers never see a version ahead
+            self._entries = entries
+            if changed:
+                self._version = version
+                self._changed.notify_all()
+        self.evict_expired()
 
     def has(self, key: str) -> bool:
-        return key in self and not self._expired(key)
+        entry = self._entries.get(key, None)
+        return entry is not None and not self._expired(entry)
 
     def remove(self, key: str):
-        if key in self:
-            del self[key]
-        del self._update_time[key]
-        del self._ttl[key]
-
-    def _expired(self, key):
-        # if we don't have enough data to tell, we assume it is expired
-        if key not in self._ttl or key not in self._update_time:
+        with self._lock:
+            if key not in self._entries:
+                return
+            entries = dict(self._entries)
+            del entries[key]
+            self._last_access.pop(key, None)
+            self._entries = entries
+            self._version += 1
+            self._changed.notify_all()
+
+    def snapshot(self) -> Snapshot:
+        # the table and the version are read together, under the writers' lock
+        with self._lock:
+            entries, version = self._entries, self._version
+        return Snapshot(
+            version=version,
+            data={k: e.value for k, e in entries.items() if not self._expired(e)}
+        )
+
+    def get_entries(self, keys: Iterable[str], stale: bool = False) -> \
+            Tuple[int, Dict[str, Entry]]:
+        # the table and the version are read together, under the writers' lock
+        with self._lock:
+            entries, version = self._entries, self._version
+        return version, {
+            k: entries[k] for k in keys
+            if k in entries and (stale or not self._expired(entries[k]))
+        }
+
+    def wait(self, since: int, keys: Optional[Iterable[str]] = None,
+             timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until (any of) the given keys changes after the version `since`.
+        Returns False if the timeout expires first.
+        """
+        keys = list(keys) if keys is not None else None
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        with self._changed:
+            while not self._changed_since(since, keys):
+                remaining = deadline - time.monotonic() if deadline is not None else None
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+        return True
+
+    def on_expire(self, callback: Callable[[str, Any], None]):
+        # the callback is called with (key, value) when an expired entry is evicted
+        self._expire_callbacks.append(callback)
+
+    def evict_expired(self) -> int:
+        now = time.monotonic()
+        # quick check, nothing to do
+        if not self._deadlines or self._deadlines[0][0] > now:
+            return 0
+        evicted: List[Entry] = []
+        evicted_keys: List[str] = []
+        with self._lock:
+            entries = self._entries
+            while self._deadlines and self._deadlines[0][0] <= now:
+                _, _, key = heapq.heappop(self._deadlines)
+                entry = entries.get(key, None)
+                # the entry might have been updated (or removed) after this deadline was set
+                if entry is None or entry.expiration_time + self._stale_grace > now:
+                    continue
+                if entries is self._entries:
+                    entries = dict(entries)
+                del entries[key]
+                self._last_access.pop(key, None)
+                evicted.append(entry)
+                evicted_keys.append(key)
+            if evicted:
+                self._entries = entries
+                self._version += 1
+                self._changed.notify_all()
+        # callbacks are called outside the lock
+        for key, entry in zip(evicted_keys, evicted):
+            for callback in self._expire_callbacks:
+                callback(key, entry.value)
+        return len(evicted)
+
+    def _changed_since(self, since: int, keys: Optional[List[str]]) -> bool:
+        if self._version <= since:
+            return False
+        if keys is None:
             return True
-        # check the time elapsed
-        ttl = self._ttl[key]
-        elapsed = int(time.time() - self._update_time[key])
+        return any(k in self._entries and self._entries[k].version > since for k in keys)
+
+    def _touch(self, key: str):
+        if key in self._last_access:
+            self._last_access[key] = time.monotonic()
+
+    def _evict_lru(self, entries: Dict[str, Entry]) -> bool:
+        # keep the number of dynamic keys bounded, drop the least recently used ones
+        evicted = False
+        while len(self._last_access) > self._max_dynamic_keys:
+            key = min(self._last_access, key=self._last_access.get)
+            del self._last_access[key]
+            evicted = entries.pop(key, None) is not None or evicted
+        return evicted
+
+    @staticmethod
+    def _encode(value: Any) -> Optional[bytes]:
+        # same format used by flask.jsonify in production mode
+        try:
+            return json.dumps(value, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def _is_dynamic(key: str) -> bool:
+        return key.startswith(DYNAMIC_KEYS_PREFIXES)
+
+    @staticmethod
+    def _expired(entry: Entry) -> bool:
         # disabled, too noisy
         # logger.debug("Resource '{}':{}Found in cache {} secs old. TTL is {}".format(
-        #     key, ' ' * (12 - len(key)), elapsed, ttl
+        #     key, ' ' * (12 - len(key)), time.monotonic() - entry.update_time, entry.ttl
         # ))
-        return 0 <= ttl < elapsed
+        return entry.expiration_time < time.monotonic()
 
 
 KnowledgeBase = _KnowledgeBase()
 
 __all__ = [
-    'KnowledgeBase'
+    'KnowledgeBase',
+    'NotSet'
 ]
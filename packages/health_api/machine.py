@@ -1,14 +1,16 @@
 import abc
 import dataclasses
 import datetime
+import functools
 import json
 import re
-import subprocess
 from typing import List
 
 import psutil
 
+from health_api.breaker import CircuitBreakers
 from health_api.constants import MHz, DISK_IMAGE_STATS_FILE
+from health_api.executor import CommandExecutor
 from health_api import logger
 
 
@@ -223,31 +225,40 @@ class GenericMachine(abc.ABC):
                 }
             }
         """
+        # a missing (or broken) file is not read again until its breaker lets us
+        breaker = CircuitBreakers.get(f"file/{DISK_IMAGE_STATS_FILE}")
+        if not breaker.allow():
+            return GenericMachine._default_software_info()
         try:
             with open(DISK_IMAGE_STATS_FILE, 'rt') as fin:
                 stats = json.load(fin)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            logger.error(str(e))
-            return GenericMachine._default_software_info()
-        # parse stats
-        date = datetime.datetime.fromtimestamp(stats['stamp'])
-        # compile output
-        return {
-            "software": {
-                "base": {
-                    "type": stats['base_type'],
-                    "version": stats['base_version'],
-                },
-                "date": {
-                    "day": date.day,
-                    "month": date.month,
-                    "year": date.year,
-                },
-                "version": stats['version']
+            # parse stats
+            date = datetime.datetime.fromtimestamp(stats['stamp'])
+            # compile output
+            software = {
+                "software": {
+                    "base": {
+                        "type": stats['base_type'],
+                        "version": stats['base_version'],
+                    },
+                    "date": {
+                        "day": date.day,
+                        "month": date.month,
+                        "year": date.year,
+                    },
+                    "version": stats['version']
+                }
             }
-        }
+        except Exception as e:
+            # log only the first failure of a streak
+            if breaker.failure(f"{type(e).__name__}: {e}"):
+                logger.error(f"Cannot read '{DISK_IMAGE_STATS_FILE}': {type(e).__name__}: {e}")
+            return GenericMachine._default_software_info()
+        breaker.success()
+        return software
 
     @staticmethod
+    @functools.lru_cache(maxsize=1)
     def get_compatible():
         # get device tree base compatible
         with open('/sys/firmware/devicetree/base/compatible', 'rt') as fin:
@@ -257,7 +268,8 @@ class GenericMachine(abc.ABC):
     @staticmethod
     def get_i2c_buses() -> List[I2CBusDescriptor]:
         buses: List[I2CBusDescriptor] = []
-        cmdout = subprocess.check_output(['i2cdetect', '-l']).decode("utf8")
+        # the list of buses does not change until the next boot
+        cmdout = CommandExecutor.check_output(['i2cdetect', '-l'], cache=True)
         pattern = re.compile(r'^i2c-([0-9]+)\s*\t(i2c)\s*\t([^t]+)\s*\t(.*)$', re.MULTILINE)
         for i2cbus in pattern.finditer(cmdout):
             buses.append(I2CBusDescriptor(
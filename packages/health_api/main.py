@@ -3,46 +3,124 @@ from dt_class_utils import DTProcess, AppStatus
 from dt_robot_utils import get_robot_type, RobotType
 
 from health_api.api import HealthAPI
-from health_api.constants import HEALTH_API_PORT
+from health_api.async_runtime import AsyncRuntime
+from health_api.constants import HEALTH_API_PORT, HEALTH_API_ASYNCIO
+from health_api.hotplug import HotplugWatcher, UEvent, is_usb_device, is_serial_acm, \
+    is_video_device
 from health_api.watchdog import health_watchdog
 from health_api.knowledge_base import KnowledgeBase
+from health_api.redetector import ComponentRedetector
+from health_api.resources import refresh_resource, resource_ttl, detect_components, \
+    current_components, redetect_components, usb_devices_changed
+from health_api.scheduler import ResourceScheduler
+from health_api.server import HealthAPIServer
+from health_api.supervisor import Supervisor
 from health_api.tegrastats_api import run_tegrastats
 from battery_drivers import Battery
+from robot.types import CSIBus
+from battery_drivers.constants import BATTERY_PCB16_READY_VID, BATTERY_PCB16_READY_PID
 from health_api.boards import board_has_gpu
+from health_api.boards.jetson_telemetry import JetsonTelemetry
 
 ROBOTS_WITH_BATTERY = [
     RobotType.DUCKIEBOT,
 ]
 
 
+def _is_battery(event: UEvent) -> bool:
+    battery_id = (int(BATTERY_PCB16_READY_VID, 16), int(BATTERY_PCB16_READY_PID, 16))
+    return is_serial_acm(event) or (is_usb_device(event) and event.usb_id == battery_id)
+
+
 class HealthAPIApp(DTProcess):
 
     def __init__(self):
         super(HealthAPIApp, self).__init__('HealthAPI')
         self.status = AppStatus.RUNNING
-        # spin a health watchdog thread
-        self.watchdog = Thread(target=health_watchdog)
-        self.watchdog.start()
         self.has_gpu = board_has_gpu()
+        # GPU telemetry is read from sysfs when possible, tegrastats is the fallback
+        self.telemetry = None
         if self.has_gpu:
-            self.tegra_stats = Thread(target=run_tegrastats)
-            self.tegra_stats.start()
-        # spin the battery drivers
+            self.telemetry = JetsonTelemetry()
+            if not self.telemetry.available:
+                self.logger.warning("GPU load not found in sysfs, falling back to tegrastats.")
+                self.telemetry = None
+        # detect the robot's components in the background, do not hold the API back
+        detect_components()
+        # keep probing the components in the background, they can be (un)plugged at runtime
+        self.redetector = ComponentRedetector(current_components, redetect_components)
+        self.redetector.start()
+        self.register_shutdown_callback(self.redetector.shutdown)
+        # create the battery drivers
         cback = lambda d: KnowledgeBase.set('battery', {'battery': {'present': True, **d}}, -1)
         self.battery = None
         robot_type = get_robot_type()
         if robot_type in ROBOTS_WITH_BATTERY:
             self.battery = Battery(cback, self.logger)
             self.register_shutdown_callback(self.battery.shutdown)
+        # react to devices being plugged in or out instead of polling for them
+        self.hotplug = HotplugWatcher()
+        if self.hotplug.open():
+            self.hotplug.subscribe(lambda _: usb_devices_changed(),
+                                   lambda e: is_usb_device(e) or is_serial_acm(e))
+            self.hotplug.subscribe(lambda _: CSIBus.invalidate(), is_video_device)
+            if self.battery is not None:
+                self.hotplug.subscribe(lambda _: self.battery.on_devices_changed(), _is_battery)
+                self.battery.use_hotplug_events()
+        # worker processes running the collectors that talk to the hardware
+        self.register_shutdown_callback(Supervisor.shutdown)
+        # collect all resources in the background, this also warms up the cache
+        self.scheduler = ResourceScheduler(refresh_resource, resource_ttl)
+        # create the REST API
+        self._api = HealthAPI(self)
+        # run everything on an event loop or with a thread each
+        if HEALTH_API_ASYNCIO:
+            self._run_asyncio()
+        else:
+            self._run_threads()
+
+    def _run_threads(self):
+        # in asyncio mode the watcher is read (and closed) by the runtime instead
+        if self.hotplug.available:
+            self.hotplug.start()
+            self.register_shutdown_callback(self.hotplug.shutdown)
+        self.scheduler.start()
+        self.register_shutdown_callback(self.scheduler.shutdown)
+        # spin a health watchdog thread
+        self.watchdog = Thread(target=health_watchdog)
+        self.watchdog.start()
+        if self.telemetry is not None:
+            self.telemetry_thread = Thread(target=self.telemetry.run)
+            self.telemetry_thread.start()
+            self.register_shutdown_callback(self.telemetry.shutdown)
+        # tegrastats publishes its full record, and the GPU telemetry if sysfs cannot be read
+        if self.has_gpu:
+            self.tegra_stats = Thread(target=run_tegrastats, args=(self.telemetry is None,))
+            self.tegra_stats.start()
+        # spin the battery drivers
+        if self.battery is not None:
             self.battery.start()
-        # register shutdown callback
-        self.register_shutdown_callback(self._terminate)
         # serve HTTP requests over the REST API
-        self._api = HealthAPI(self)
-        self._api.run(host='0.0.0.0', port=HEALTH_API_PORT)
+        self._server = HealthAPIServer(self._api, host='0.0.0.0', port=HEALTH_API_PORT)
+        # register shutdown callbacks
+        self.register_shutdown_callback(self._server.shutdown)
+        self.register_shutdown_callback(self._terminate)
+        self._server.serve()
+
+    def _run_asyncio(self):
+        runtime = AsyncRuntime(self._api, self.scheduler, host='0.0.0.0', port=HEALTH_API_PORT,
+                               battery=self.battery,
+                               tegrastats=self.has_gpu,
+                               telemetry=self.telemetry,
+                               hotplug=self.hotplug if self.hotplug.available else None)
+        self.register_shutdown_callback(runtime.shutdown)
+        # blocks until shutdown
+        runtime.run()
 
     def _terminate(self):
         self.watchdog.join()
+        if self.telemetry is not None:
+            self.telemetry_thread.join()
         if self.has_gpu:
             self.tegra_stats.join()
         if self.battery is not None:
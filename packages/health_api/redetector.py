@@ -0,0 +1,67 @@
+from threading import Thread, Event
+from typing import Callable, List
+
+from health_api import logger
+from health_api.constants import COMPONENTS_REDETECTION_PERIOD_SECS, COMPONENTS_REDETECTION_SLICE
+from robot.types import HardwareComponent
+
+
+class ComponentRedetector:
+    """
+    Probes the robot's components again, periodically, so that components that are
+    unplugged (or re-seated) while the device is running are noticed.
+
+    Only a small slice of the components is probed at every step, in round-robin order,
+    so that the buses are never saturated.
+    """
+
+    def __init__(self, components: Callable[[], List[HardwareComponent]],
+                 redetect: Callable[[List[HardwareComponent]], None],
+                 period: float = COMPONENTS_REDETECTION_PERIOD_SECS,
+                 slice_size: int = COMPONENTS_REDETECTION_SLICE):
+        self._components = components
+        self._redetect = redetect
+        self._period = period
+        self._slice_size = max(1, slice_size)
+        self._cursor = 0
+        self._is_shutdown = False
+        self._wakeup = Event()
+        self._worker = Thread(target=self._work, name="redetector", daemon=True)
+
+    def start(self):
+        self._worker.start()
+
+    def join(self):
+        if self._worker.is_alive():
+            self._worker.join()
+
+    def is_shutdown(self):
+        return self._is_shutdown
+
+    def shutdown(self):
+        self._is_shutdown = True
+        self._wakeup.set()
+        self.join()
+
+    def step(self):
+        components = self._components()
+        # nothing to do until the first detection is complete
+        if not components:
+            return
+        start = self._cursor % len(components)
+        batch = (components[start:] + components[:start])[:self._slice_size]
+        self._cursor = start + len(batch)
+        self._redetect(batch)
+
+    def _work(self):
+        while not self._wakeup.wait(self._period):
+            # noinspection PyBroadException
+            try:
+                self.step()
+            except BaseException as e:
+                logger.error(f"Component re-detection failed with error: {str(e)}")
+
+
+__all__ = [
+    'ComponentRedetector'
+]
@@ -1,12 +1,28 @@
-from health_api.knowledge_base import KnowledgeBase
+import dataclasses
+import hashlib
+import json
+import time
+from collections import deque
+from datetime import datetime
+from threading import Event, Lock, Thread
+from typing import Dict, Any, Optional, Iterable, Tuple, List, Deque
+
+from health_api import logger
+from health_api.breaker import CircuitBreakers, CircuitOpen
+from health_api.constants import STALE_WHILE_REVALIDATE, COMPONENTS_MAX_EVENTS, \
+    COLLECTOR_ISOLATION
+from health_api.discovery import DiscoveryCache
+from health_api.knowledge_base import KnowledgeBase, Entry
+from health_api.supervisor import Supervisor, CollectorTimeout
+from health_api.worker import collect
 from health_api.boards import get_board
 from robot import get_robot
+from robot.types import HardwareComponent, USBBus
 
 machine = get_board()
 
-# add robot components to the knowledge base
+# robot components are detected in the background (see detect_components)
 robot = get_robot()
-KnowledgeBase.set("components", {"components": robot.serialize_components()}, -1)
 
 resources = {
     'volts': machine.get_voltage,
@@ -21,7 +37,9 @@ resources = {
     'status': machine.get_throttled,
     'battery': machine.get_battery,
     'gpu': machine.get_gpu,
-    'components': lambda: []
+    'components': lambda: [],
+    # published by the tegrastats reader (Jetson boards), empty when tegrastats is not running
+    'tegrastats': lambda: {}
 }
 
 resource_ttl = {
@@ -37,13 +55,63 @@ resource_ttl = {
     'status': 1,
     'battery': -1,
     'gpu': 1,
-    'components': -1
+    'components': -1,
+    'tegrastats': -1
 }
 
 all_resources = resource_ttl.keys()
 
+# collectors that talk to the hardware (and can hang on it), run in supervised workers
+isolated_collectors = {
+    'volts': 'get_voltage',
+    'temperature': 'get_temperature',
+    'firmware': 'get_firmware',
+    'status': 'get_throttled',
+}
+
+
+class _Flight:
+    """
+    A collection in progress, concurrent callers wait on it instead of collecting again.
+    """
+
+    def __init__(self):
+        self.done = Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_flights: Dict[str, _Flight] = {}
+_flights_lock = Lock()
+
+_components_lock = Lock()
+
+# state of the collectors: {resource: {timed_out, stale, timeouts, duration, last_success}}
+_collector_status: Dict[str, Dict[str, Any]] = {}
+_status_lock = Lock()
+_components: List[HardwareComponent] = []
+_component_events: Deque[Dict] = deque(maxlen=COMPONENTS_MAX_EVENTS)
 
-def cached_resource(resource):
+
+@dataclasses.dataclass(frozen=True)
+class Serialized:
+    body: bytes
+    # content hash of the body
+    digest: str
+    # highest version among the contributing resources
+    version: int
+    # wall-clock time of the last change among the contributing resources
+    modified_time: float
+
+
+# serialized bodies: {(resources, fields): ((versions, meta), serialized)}
+_bodies: Dict[Tuple[Tuple[str, ...], Tuple[str, ...]],
+              Tuple[Tuple[Tuple[int, ...], bytes], Serialized]] = {}
+_bodies_lock = Lock()
+_MAX_BODIES = 64
+
+
+def cached_resource(resource, stale_while_revalidate: bool = STALE_WHILE_REVALIDATE):
     if resource not in resources:
         raise KeyError(resource)
     try:
@@ -54,17 +122,350 @@ def cached_resource(resource):
         # ))
         return res
     except KeyError:
-        fcn = resources[resource]
-        res = fcn()
-        # disabled, too noisy
-        # logger.debug("Resource '{}':{}Fetching new data.".format(
-        #     resource, ' ' * (12 - len(resource))
-        # ))
-        KnowledgeBase.set(resource, res, resource_ttl[resource])
-        return res
+        if stale_while_revalidate:
+            entry = KnowledgeBase.get_entry(resource, stale=True)
+            if entry is not None:
+                # serve the previous value and refresh it in the background
+                _refresh_in_background(resource)
+                return entry.value
+        # the scheduler did not publish this resource yet (or it fell behind), collect it now
+        return refresh_resource(resource)
+
+
+def refresh_resource(resource):
+    if resource not in resources:
+        raise KeyError(resource)
+    # single-flight: only the first caller collects, everybody else waits for its result
+    with _flights_lock:
+        flight = _flights.get(resource, None)
+        leader = flight is None
+        if leader:
+            flight = _flights[resource] = _Flight()
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+    # we are the leader
+    try:
+        flight.value = _collect(resource)
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[resource]
+        flight.done.set()
+    return flight.value
+
+
+def detect_components(rescan: bool = False) -> Thread:
+    """
+    Detects the robot's hardware in a background thread. The 'components' resource is
+    published with status 'pending' (and the components detected so far) while the
+    detection is in progress, and with status 'ready' once it is complete.
+    """
+    _publish_components([], "pending")
+    thread = Thread(target=_detect_components, args=(rescan,), name="components", daemon=True)
+    thread.start()
+    return thread
+
+
+def rescan_components() -> Dict:
+    # detect the robot's hardware again, ignoring the results cached for this boot
+    detect_components(rescan=True)
+    return KnowledgeBase.get("components")
+
+
+def current_components() -> List[HardwareComponent]:
+    # the components found by the last complete detection
+    return list(_components)
+
+
+def redetect_components(components: List[HardwareComponent]):
+    # probe the given components again and publish the changes (if any)
+    with _components_lock:
+        before = {component.key: component.detected for component in components}
+        robot.redetect(components)
+        changed = False
+        for component in components:
+            if component.detected == before[component.key]:
+                continue
+            changed = True
+            event = "added" if component.detected else "removed"
+            logger.info(f"Component '{component.key}' was {event}.")
+            _component_events.append({
+                "time": datetime.now().isoformat(),
+                "key": component.key,
+                "event": event,
+            })
+        if changed:
+            _publish_components(_components, "ready")
+            DiscoveryCache.set("components", {c.key: c.detected for c in _components})
+
+
+def usb_devices_changed():
+    # called when a USB device is plugged in or out, probe the USB components again
+    USBBus.invalidate()
+    redetect_components([c for c in current_components() if isinstance(c.bus, USBBus)])
+
+
+def _detect_components(rescan: bool):
+    global _components
+    # one detection at a time, the buses are shared
+    with _components_lock:
+        detected: List[HardwareComponent] = []
+
+        def progress(component: HardwareComponent):
+            detected.append(component)
+            _publish_components(detected, "pending")
+
+        try:
+            components = robot.rescan(progress) if rescan else robot.get_components(progress)
+        except BaseException as e:
+            logger.error(f"Component detection failed: {str(e)}")
+            _publish_components(detected, "error")
+            return
+        _components = components
+        _publish_components(components, "ready")
+
+
+def _publish_components(components: List[HardwareComponent], status: str):
+    # not "status", this is merged with the other resources at / and "status" is taken
+    KnowledgeBase.set("components", {
+        "detection_status": status,
+        "components": [component.as_dict() for component in components],
+        "events": list(_component_events)
+    }, -1)
+
+
+def serialized_resource(resource) -> Serialized:
+    if _meta([resource]):
+        # the state of the collector goes in the body
+        return serialized_resources([resource])
+    entry = _resource_entry(resource)
+    if entry.encoded is None:
+        # this should never happen, resources are always JSON-serializable
+        body = json.dumps(entry.value).encode('utf-8')
+        return Serialized(body, hashlib.blake2b(body, digest_size=16).hexdigest(),
+                          entry.version, entry.modified_time)
+    return Serialized(entry.encoded, entry.digest, entry.version, entry.modified_time)
+
+
+def serialized_resources(names: Iterable[str], fields: Optional[Iterable[str]] = None) -> \
+        Serialized:
+    """
+    Returns the JSON encoding of the union of the given resources.
+
+    The body is assembled from the JSON fragments encoded when each resource was published
+    and it is cached until one of the contributing resources changes.
+    If `fields` is given (e.g., ['cpu.percentage', 'battery.percentage']), only those fields
+    are included in the output.
+    """
+    names = tuple(names)
+    fields = tuple(fields) if fields else ()
+    entries = [_available_entry(resource) for resource in names]
+    # the state of the collectors is part of the body
+    meta = _meta(names)
+    meta_encoded = json.dumps(meta, separators=(',', ':'), sort_keys=True).encode('utf-8') \
+        if meta else b''
+    versions = tuple(entry.version if entry else -1 for entry in entries)
+    entries = [entry for entry in entries if entry is not None]
+    # nothing changed since the last time
+    state_cached, serialized = _bodies.get((names, fields), (None, None))
+    if state_cached == (versions, meta_encoded):
+        return serialized
+    # assemble body from the fragments (not possible if the fields are projected)
+    fragments = [] if not fields else None
+    keys = {'_meta'}
+    for entry in entries if fragments is not None else []:
+        if not entry.value:
+            continue
+        if entry.encoded is None or not isinstance(entry.value, dict) or \
+                not keys.isdisjoint(entry.value):
+            # this resource cannot be merged as a fragment (or it would repeat a key of another
+            # resource, the last one wins), encode everything
+            fragments = None
+            break
+        keys.update(entry.value)
+        # strip the curly brackets, we only want the content of the object
+        fragments.append(entry.encoded[1:-1])
+    if fragments is not None:
+        if meta:
+            fragments.append(b'"_meta":' + meta_encoded)
+        body = b'{' + b','.join(fragments) + b'}'
+    else:
+        merged = {}
+        for entry in entries:
+            merged.update(entry.value)
+        if fields:
+            merged = _project(merged, fields)
+        if meta:
+            merged['_meta'] = meta
+        body = json.dumps(merged, separators=(',', ':'), sort_keys=True).encode('utf-8')
+    serialized = Serialized(
+        body=body,
+        digest=hashlib.blake2b(body, digest_size=16).hexdigest(),
+        version=max((entry.version for entry in entries), default=0),
+        modified_time=max((entry.modified_time for entry in entries), default=0.0)
+    )
+    with _bodies_lock:
+        if (names, fields) not in _bodies and len(_bodies) >= _MAX_BODIES:
+            # drop the oldest combination
+            del _bodies[next(iter(_bodies))]
+        _bodies[(names, fields)] = ((versions, meta_encoded), serialized)
+    return serialized
+
+
+def changed_resources(names: Iterable[str], since: int) -> Tuple[int, Dict[str, Any]]:
+    """
+    Returns the resources (among the given ones) that changed after the version `since`,
+    together with the cursor to use the next time.
+    """
+    # the cursor is read first, changes happening while we read are returned again next time
+    cursor = KnowledgeBase.version
+    changed = {}
+    for resource in names:
+        entry = _resource_entry(resource)
+        if entry.version > since:
+            changed[resource] = entry.value
+    return cursor, changed
+
+
+def _project(data: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    # keeps only the given dot-separated paths, missing paths are ignored
+    out = {}
+    for field in fields:
+        path: List[str] = field.split('.')
+        value = data
+        for key in path:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            node = out
+            for key in path[:-1]:
+                node = node.setdefault(key, {})
+            node[path[-1]] = value
+    return out
+
+
+def _resource_entry(resource):
+    entry = KnowledgeBase.get_entry(resource)
+    if entry is None:
+        cached_resource(resource)
+        entry = KnowledgeBase.get_entry(resource, stale=True)
+    return entry
+
+
+def _available_entry(resource) -> Optional[Entry]:
+    # same as _resource_entry but None when the collector failed and there is nothing to serve
+    try:
+        return _resource_entry(resource)
+    except (CollectorTimeout, CircuitOpen):
+        return None
+
+
+def _refresh_in_background(resource):
+    with _flights_lock:
+        if resource in _flights:
+            return
+    Thread(target=_refresh_quietly, args=(resource,), daemon=True).start()
+
+
+def _refresh_quietly(resource):
+    # noinspection PyBroadException
+    try:
+        refresh_resource(resource)
+    except BaseException as e:
+        logger.error(f"Resource '{resource}': background refresh failed with error: {str(e)}")
+
+
+def collector_status() -> Dict[str, Dict]:
+    with _status_lock:
+        return {resource: dict(status) for resource, status in _collector_status.items()}
+
+
+def stale_resources(names: Iterable[str]) -> List[str]:
+    # resources currently served from an earlier collection (their collector failed)
+    return [n for n in names if _collector_status.get(n, {}).get("stale", False)]
+
+
+def _meta(names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    # state of the collectors of the given resources that are not serving fresh values
+    meta = {}
+    with _status_lock:
+        for resource in names:
+            status = _collector_status.get(resource, None)
+            if status is None or not status["stale"]:
+                continue
+            meta[resource] = {
+                "stale": True,
+                "timed_out": status["timed_out"],
+                "last_success": status.get("last_success", None),
+            }
+    return meta
+
+
+def _collect(resource):
+    stime = time.monotonic()
+    breaker = CircuitBreakers.get(f"collector/{resource}")
+    try:
+        # collectors that keep failing are not called again until their breaker lets us
+        breaker.check()
+        try:
+            if COLLECTOR_ISOLATION and resource in isolated_collectors:
+                res = Supervisor.call(collect, isolated_collectors[resource])
+            else:
+                fcn = resources[resource]
+                res = fcn()
+        except BaseException as e:
+            breaker.failure(str(e))
+            raise
+    except (CollectorTimeout, CircuitOpen) as e:
+        _update_status(resource, timed_out=isinstance(e, CollectorTimeout), stale=True)
+        # keep serving the last value we have (if any) as it is, it expires (and it is evicted)
+        # at the time it would have anyway, clients can tell from the `_meta` of the response
+        entry = KnowledgeBase.get_entry(resource, stale=True)
+        if entry is None:
+            raise
+        return entry.value
+    breaker.success()
+    # disabled, too noisy
+    # logger.debug("Resource '{}':{}Fetching new data.".format(
+    #     resource, ' ' * (12 - len(resource))
+    # ))
+    KnowledgeBase.set(resource, res, resource_ttl[resource])
+    _update_status(resource, timed_out=False, stale=False, duration=time.monotonic() - stime)
+    return res
+
+
+def _update_status(resource: str, timed_out: bool, stale: bool, duration: Optional[float] = None):
+    with _status_lock:
+        status = _collector_status.setdefault(resource, {"timeouts": 0})
+        status["timed_out"] = timed_out
+        status["stale"] = stale
+        if timed_out:
+            status["timeouts"] += 1
+        if duration is not None:
+            status["duration"] = duration
+            status["last_success"] = time.time()
 
 
 __all__ = [
     'cached_resource',
-    'all_resources'
+    'refresh_resource',
+    'serialized_resource',
+    'serialized_resources',
+    'changed_resources',
+    'detect_components',
+    'current_components',
+    'redetect_components',
+    'usb_devices_changed',
+    'rescan_components',
+    'collector_status',
+    'stale_resources',
+    'Serialized',
+    'all_resources',
+    'resource_ttl'
 ]
@@ -0,0 +1,100 @@
+import heapq
+import random
+import time
+from threading import Thread, Event
+from typing import Dict, Callable, List, Tuple, Any
+
+from health_api import logger
+from health_api.breaker import CircuitOpen
+from health_api.constants import RESOURCE_SCHEDULER_JITTER
+from health_api.knowledge_base import KnowledgeBase
+
+
+class ResourceScheduler:
+    """
+    Runs the collector of every resource on its own timer and publishes the results into
+    the KnowledgeBase, so that HTTP handlers only read precomputed values.
+
+    Resources with a positive TTL are refreshed slightly before they expire, resources
+    with a non-positive TTL are collected once (unless somebody else already published them).
+    """
+
+    def __init__(self, refresh: Callable[[str], Any], ttls: Dict[str, int],
+                 jitter: float = RESOURCE_SCHEDULER_JITTER):
+        self._refresh = refresh
+        self._ttls = dict(ttls)
+        self._jitter = max(0.0, min(jitter, 1.0))
+        self._queue: List[Tuple[float, str]] = []
+        self._is_shutdown = False
+        self._wakeup = Event()
+        self._worker = Thread(target=self._work, daemon=True)
+
+    @property
+    def periodic_resources(self) -> List[str]:
+        return [resource for resource, ttl in self._ttls.items() if ttl > 0]
+
+    def start(self, warmup: bool = True):
+        if warmup:
+            self.warmup()
+        now = time.monotonic()
+        for resource in self.periodic_resources:
+            heapq.heappush(self._queue, (now + self.offset(resource), resource))
+        self._worker.start()
+
+    def warmup(self):
+        for resource in self._ttls:
+            self.collect(resource)
+
+    def join(self):
+        if self._worker.is_alive():
+            self._worker.join()
+
+    def is_shutdown(self):
+        return self._is_shutdown
+
+    def shutdown(self):
+        self._is_shutdown = True
+        self._wakeup.set()
+        self.join()
+
+    def offset(self, resource: str) -> float:
+        # spread the first execution of the collectors over their period
+        return random.uniform(0, self._ttls[resource])
+
+    def period(self, resource: str) -> float:
+        # refresh before the TTL expires, jitter keeps the collectors from firing together
+        ttl = self._ttls[resource]
+        return ttl * (1.0 - self._jitter * (0.5 + 0.5 * random.random()))
+
+    def collect(self, resource: str):
+        ttl = self._ttls[resource]
+        # one-shot resources might have been published by somebody else (e.g., battery drivers)
+        if ttl <= 0 and KnowledgeBase.has(resource):
+            return
+        # noinspection PyBroadException
+        try:
+            self._refresh(resource)
+        except CircuitOpen:
+            # the collector keeps failing, its errors were already reported
+            pass
+        except BaseException as e:
+            logger.error(f"Resource '{resource}': collector failed with error: {str(e)}")
+
+    def _work(self):
+        while not self._is_shutdown:
+            if len(self._queue) == 0:
+                return
+            deadline, resource = self._queue[0]
+            wait = deadline - time.monotonic()
+            if wait > 0:
+                self._wakeup.wait(wait)
+                continue
+            heapq.heappop(self._queue)
+            self.collect(resource)
+            KnowledgeBase.evict_expired()
+            heapq.heappush(self._queue, (time.monotonic() + self.period(resource), resource))
+
+
+__all__ = [
+    'ResourceScheduler'
+]
@@ -0,0 +1,58 @@
+from flask import Flask
+
+from health_api import logger
+from health_api.constants import HEALTH_API_PRODUCTION_SERVER, HEALTH_API_WORKERS, \
+    HEALTH_API_IDLE_TIMEOUT_SECS, HEALTH_API_MAX_CONNECTIONS
+
+
+class HealthAPIServer:
+    """
+    Serves the given Flask app over HTTP.
+
+    By default, the development server shipped with Flask is used. When the environment
+    variable HEALTH_API_PRODUCTION_SERVER is set, requests are served by `waitress` instead,
+    with a bounded pool of workers, HTTP/1.1 keep-alive, idle connection timeouts and
+    graceful shutdown. Waitress does not enforce a deadline on requests being processed,
+    the time a request can take is bounded by the handlers themselves (see
+    LONG_POLL_MAX_WAIT_SECS and COLLECTOR_TIMEOUT_SECS).
+    """
+
+    def __init__(self, app: Flask, host: str, port: int,
+                 production: bool = HEALTH_API_PRODUCTION_SERVER):
+        self._app = app
+        self._host = host
+        self._port = port
+        self._production = production
+        self._server = None
+
+    def serve(self):
+        if not self._production:
+            self._app.run(host=self._host, port=self._port, threaded=True)
+            return
+        # production server
+        from waitress.server import create_server
+        self._server = create_server(
+            self._app,
+            host=self._host,
+            port=self._port,
+            threads=HEALTH_API_WORKERS,
+            # closes connections idle for longer than this, requests in flight are not affected
+            channel_timeout=HEALTH_API_IDLE_TIMEOUT_SECS,
+            connection_limit=HEALTH_API_MAX_CONNECTIONS,
+            ident="dt-device-health",
+        )
+        logger.info(f"Serving on http://{self._host}:{self._port} "
+                    f"with {HEALTH_API_WORKERS} workers.")
+        self._server.run()
+
+    def shutdown(self, timeout: float = 5):
+        if self._server is None:
+            return
+        # stop accepting new connections, then let the workers finish the pending requests
+        self._server.close()
+        self._server.task_dispatcher.shutdown(timeout=timeout)
+
+
+__all__ = [
+    'HealthAPIServer'
+]
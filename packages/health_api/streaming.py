@@ -0,0 +1,63 @@
+import time
+from threading import BoundedSemaphore
+from typing import Iterable, Iterator, Optional
+
+from dt_class_utils import DTProcess
+
+from health_api.constants import STREAM_MAX_SUBSCRIBERS, STREAM_MIN_INTERVAL_SECS, \
+    STREAM_HEARTBEAT_SECS
+from health_api.knowledge_base import KnowledgeBase, Entry
+
+_subscribers = BoundedSemaphore(STREAM_MAX_SUBSCRIBERS)
+
+
+def subscribe() -> bool:
+    # returns False when the server cannot take any more subscribers
+    return _subscribers.acquire(blocking=False)
+
+
+def unsubscribe():
+    _subscribers.release()
+
+
+def stream_resources(names: Iterable[str], since: int = 0,
+                     rate: Optional[float] = None) -> Iterator[bytes]:
+    """
+    Generates Server-Sent Events for the given resources, one every time a resource is
+    published with a new content. Subscribers cannot receive more than one batch of events
+    every STREAM_MIN_INTERVAL_SECS seconds, changes happening in between are coalesced.
+    """
+    names = list(names)
+    min_interval = STREAM_MIN_INTERVAL_SECS
+    if rate:
+        min_interval = max(min_interval, 1.0 / rate)
+    process = DTProcess.get_instance()
+    last_batch = -min_interval
+    while not process.is_shutdown():
+        # rate limiting
+        wait = last_batch + min_interval - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        if not KnowledgeBase.wait(since, names, timeout=STREAM_HEARTBEAT_SECS):
+            # keep the connection alive
+            yield b': heartbeat\n\n'
+            continue
+        version, entries = KnowledgeBase.get_entries(names, stale=True)
+        for name, entry in entries.items():
+            if entry.version > since:
+                yield _event(name, entry)
+        since = version
+        last_batch = time.monotonic()
+
+
+def _event(name: str, entry: Entry) -> bytes:
+    return b'id: %d\nevent: %s\ndata: %s\n\n' % (
+        entry.version, name.encode('utf-8'), entry.encoded or b'null'
+    )
+
+
+__all__ = [
+    'subscribe',
+    'unsubscribe',
+    'stream_resources'
+]
@@ -0,0 +1,218 @@
+import collections
+import os
+import signal
+import subprocess
+import sys
+import time
+from queue import Queue, Empty
+from threading import Lock, Timer
+from typing import Any, Callable, Dict, Deque, List
+
+from health_api import logger
+from health_api.breaker import CircuitBreakers
+from health_api.constants import COLLECTOR_WORKERS, COLLECTOR_TIMEOUT_SECS
+from health_api.worker import read_message, write_message
+
+
+class CollectorTimeout(TimeoutError):
+    pass
+
+
+class WorkersUnavailable(CollectorTimeout):
+    # no worker could be acquired in time, the function was not called at all
+    pass
+
+
+class _Worker:
+    """
+    A long-lived Python process (see health_api.worker) that runs one function at a time.
+    """
+
+    def __init__(self):
+        env = dict(os.environ)
+        # the worker sees the same packages we do
+        env['PYTHONPATH'] = os.pathsep.join(p for p in sys.path if p)
+        self._process = subprocess.Popen(
+            [sys.executable, '-m', 'health_api.worker'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            bufsize=0,
+            env=env,
+            # the worker and its children form a group we can kill at once
+            start_new_session=True
+        )
+        self.killed = False
+
+    @property
+    def alive(self) -> bool:
+        return not self.killed and self._process.poll() is None
+
+    def call(self, fcn: Callable, args: tuple) -> Any:
+        # the breakers live here, the worker gets a copy and sends back what it changed
+        write_message(self._process.stdin, (fcn, args, CircuitBreakers.snapshot()))
+        response = read_message(self._process.stdout)
+        if response is None:
+            raise BrokenPipeError("The worker process terminated unexpectedly.")
+        success, result, breakers = response
+        CircuitBreakers.restore(breakers)
+        if not success:
+            raise result
+        return result
+
+    def kill(self):
+        self.killed = True
+        # processes started by the worker in sessions of their own (e.g., the helper shells of
+        # health_api.executor) survive the group, find them while they are still its children
+        helpers = _descendants(self._process.pid)
+        try:
+            os.killpg(self._process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        for pid in helpers:
+            try:
+                # kill the helper along with its own children, if it leads a group
+                os.killpg(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+        self._process.wait()
+
+
+class _Supervisor:
+    """
+    Runs functions that talk to the hardware (and can hang on it, e.g., a wedged I2C bus)
+    on a small pool of worker processes. Every call has a deadline, workers that miss it
+    are killed and replaced, the caller gets a CollectorTimeout instead of hanging forever.
+    """
+
+    def __init__(self, workers: int = COLLECTOR_WORKERS):
+        self._workers: Queue = Queue()
+        self._max_workers = workers
+        self._num_workers = 0
+        self._lock = Lock()
+        # stats
+        self._spawns = 0
+        self._calls = 0
+        self._timeouts = 0
+        self._latencies: Deque[float] = collections.deque(maxlen=256)
+
+    def call(self, fcn: Callable, *args, timeout: float = COLLECTOR_TIMEOUT_SECS) -> Any:
+        # `fcn` must be a module-level function, it is pickled by reference
+        stime = time.monotonic()
+        # waiting for a worker is bounded by `timeout` on its own (WorkersUnavailable)
+        worker = self._acquire(timeout)
+        # kill the worker if the call takes too long, this unblocks the reader; the call gets
+        # the whole timeout, the time spent waiting for the worker is not the worker's fault
+        watchdog = Timer(timeout, worker.kill)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            result = worker.call(fcn, args)
+        except (BrokenPipeError, EOFError, OSError):
+            if worker.killed:
+                with self._lock:
+                    self._timeouts += 1
+                logger.warning(f"Function '{fcn.__name__}{args}' did not complete in {timeout} "
+                               f"seconds, its worker was killed.")
+                raise CollectorTimeout(f"'{fcn.__name__}' timed out after {timeout} seconds")
+            raise
+        finally:
+            watchdog.cancel()
+            self._release(worker)
+        with self._lock:
+            self._calls += 1
+            self._latencies.append(time.monotonic() - stime)
+        return result
+
+    def stats(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            return {
+                "workers": self._num_workers,
+                "spawns": self._spawns,
+                "calls": self._calls,
+                "timeouts": self._timeouts,
+                "latency": {
+                    "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+                    "max": latencies[-1] if latencies else 0.0,
+                }
+            }
+
+    def shutdown(self):
+        while True:
+            try:
+                self._workers.get_nowait().kill()
+            except Empty:
+                return
+
+    def _acquire(self, timeout: float) -> _Worker:
+        while True:
+            try:
+                worker = self._workers.get_nowait()
+            except Empty:
+                break
+            if worker.alive:
+                return worker
+            self._forget()
+        with self._lock:
+            spawn = self._num_workers < self._max_workers
+            if spawn:
+                self._num_workers += 1
+                self._spawns += 1
+        if spawn:
+            return _Worker()
+        # all the workers are busy, wait for one
+        try:
+            worker = self._workers.get(timeout=timeout)
+        except Empty:
+            raise WorkersUnavailable(f"No workers available after {timeout} seconds")
+        if not worker.alive:
+            with self._lock:
+                self._spawns += 1
+            return _Worker()
+        return worker
+
+    def _release(self, worker: _Worker):
+        # only healthy workers go back to the pool
+        if worker.alive:
+            self._workers.put(worker)
+        else:
+            self._forget()
+
+    def _forget(self):
+        with self._lock:
+            self._num_workers -= 1
+
+
+def _descendants(pid: int) -> List[int]:
+    # all the processes descending from the given one, read from /proc
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", "rt") as fin:
+                stat = fin.read()
+        except OSError:
+            continue
+        # the command name (2nd field) can contain spaces, the parent pid follows the state
+        ppid = int(stat[stat.rindex(")") + 2:].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    found = []
+    stack = list(children.get(pid, []))
+    while stack:
+        child = stack.pop()
+        found.append(child)
+        stack.extend(children.get(child, []))
+    return found
+
+
+Supervisor = _Supervisor()
+
+__all__ = [
+    'Supervisor',
+    'CollectorTimeout',
+    'WorkersUnavailable'
+]
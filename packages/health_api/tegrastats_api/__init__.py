@@ -1 +1,3 @@
-from .utils import run_tegrastats
+from .utils import run_tegrastats, decode_tegrastats, clear_tegrastats, tegrastats_command, \
+    TEGRASTATS
+from .parser import parse_tegrastats, TegrastatsRecord
@@ -0,0 +1,161 @@
+import dataclasses
+from typing import Dict, List, Optional, Tuple
+
+# rails shared by the GPU with other units, they do not tell what the GPU alone is drawing
+SHARED_RAIL_UNITS = {"CPU", "SOC", "CV"}
+
+
+@dataclasses.dataclass(frozen=True)
+class MemoryUsage:
+    # MB
+    used: int
+    total: int
+
+
+@dataclasses.dataclass(frozen=True)
+class Load:
+    # percentage (None when the unit is off) and frequency in MHz (if reported), the highest
+    # one for units reporting a frequency per cluster (e.g., GR3D_FREQ 0%@[305,305])
+    percentage: Optional[int]
+    frequency: Optional[int] = None
+
+
+@dataclasses.dataclass(frozen=True)
+class PowerRail:
+    # mW
+    current: int
+    average: int
+
+
+@dataclasses.dataclass(frozen=True)
+class TegrastatsRecord:
+    ram: Optional[MemoryUsage] = None
+    swap: Optional[MemoryUsage] = None
+    # one entry per CPU core
+    cpu: Tuple[Load, ...] = ()
+    # engines reporting load@frequency, e.g., EMC_FREQ, GR3D_FREQ, VIC_FREQ
+    engines: Dict[str, Load] = dataclasses.field(default_factory=dict)
+    # celsius, e.g., GPU, CPU, PMIC
+    temperatures: Dict[str, float] = dataclasses.field(default_factory=dict)
+    # e.g., POM_5V_GPU, VDD_IN
+    rails: Dict[str, PowerRail] = dataclasses.field(default_factory=dict)
+    # fields reporting a single value, e.g., APE, NVDEC
+    values: Dict[str, int] = dataclasses.field(default_factory=dict)
+
+    @property
+    def gpu_usage(self) -> Optional[int]:
+        gpu = self.engines.get("GR3D_FREQ", None)
+        return gpu.percentage if gpu else None
+
+    @property
+    def gpu_temperature(self) -> Optional[float]:
+        # GPU@34.5C (L4T 32) or gpu@46.5C (L4T 35)
+        return next((t for name, t in self.temperatures.items() if name.upper() == "GPU"), None)
+
+    @property
+    def gpu_power(self) -> Optional[PowerRail]:
+        # e.g., POM_5V_GPU, VDD_GPU, not VDD_CPU_GPU_CV
+        return next((r for name, r in self.rails.items() if is_gpu_rail(name)), None)
+
+    def as_dict(self) -> Dict:
+        return dataclasses.asdict(self)
+
+
+def parse_tegrastats(line: str) -> TegrastatsRecord:
+    """
+    Turns a line of tegrastats output into a record, in a single pass over its tokens.
+    Unknown or malformed fields are skipped, missing fields are left empty.
+    """
+    ram = swap = None
+    cpu: List[Load] = []
+    engines: Dict[str, Load] = {}
+    temperatures: Dict[str, float] = {}
+    rails: Dict[str, PowerRail] = {}
+    values: Dict[str, int] = {}
+    tokens = line.split()
+    n = len(tokens)
+    i = 0
+    while i < n:
+        token = tokens[i]
+        following = tokens[i + 1] if i + 1 < n else ""
+        try:
+            if token == "RAM" or token == "SWAP":
+                # RAM 2133/3956MB (lfb 73x4MB) / SWAP 0/1978MB (cached 0MB)
+                used, total = following.rstrip("MB").split("/")
+                usage = MemoryUsage(int(used), int(total))
+                if token == "RAM":
+                    ram = usage
+                else:
+                    swap = usage
+                i += 2
+            elif token == "CPU" and following.startswith("["):
+                # CPU [12%@1479,3%@1479,off,off]
+                cpu = [_load(core) for core in following.strip("[]").split(",")]
+                i += 2
+            elif token.startswith("("):
+                # annotations, e.g., (lfb 73x4MB), skip until the closing parenthesis
+                while i < n and not tokens[i].endswith(")"):
+                    i += 1
+                i += 1
+            elif "@" in token and token.endswith("C"):
+                # GPU@34.5C
+                name, temp = token.split("@", 1)
+                temperatures[name] = float(temp[:-1])
+                i += 1
+            elif "/" in following and following[0].isdigit() and token.isupper():
+                # POM_5V_GPU 0/0 or VDD_IN 5000mW/5000mW
+                current, average = following.split("/", 1)
+                rails[token] = PowerRail(_int(current), _int(average))
+                i += 2
+            elif following.endswith("%") or "%@" in following:
+                # GR3D_FREQ 0%@921 or EMC_FREQ 0%
+                engines[token] = _load(following)
+                i += 2
+            elif following.isdigit() and token.isupper():
+                # APE 25
+                values[token] = int(following)
+                i += 2
+            else:
+                i += 1
+        except ValueError:
+            # malformed field, skip it
+            i += 1
+    return TegrastatsRecord(
+        ram=ram,
+        swap=swap,
+        cpu=tuple(cpu),
+        engines=engines,
+        temperatures=temperatures,
+        rails=rails,
+        values=values,
+    )
+
+
+def is_gpu_rail(name: str) -> bool:
+    # power rails feeding the GPU only
+    units = set(name.upper().split("_"))
+    return "GPU" in units and not (units & SHARED_RAIL_UNITS)
+
+
+def _load(token: str) -> Load:
+    # 12%@1479, 0%, off, 0%@[305] or 0%@[305,305] (L4T >= 34)
+    if token == "off":
+        return Load(None)
+    percentage, _, frequency = token.partition("@")
+    frequencies = [int(f) for f in frequency.strip("[]").split(",") if f]
+    return Load(int(percentage.rstrip("%")), max(frequencies) if frequencies else None)
+
+
+def _int(token: str) -> int:
+    # 5000mW, 2170
+    return int(token.rstrip("mW"))
+
+
+__all__ = [
+    'parse_tegrastats',
+    'is_gpu_rail',
+    'TegrastatsRecord',
+    'MemoryUsage',
+    'PowerRail',
+    'Load'
+]
@@ -1,20 +1,23 @@
 import os
-import re
 import subprocess
+from typing import List
 
 from dt_class_utils import DTProcess
 
+from health_api.constants import TEGRASTATS_INTERVAL_MS
 from health_api.knowledge_base import KnowledgeBase
+from .parser import parse_tegrastats, TegrastatsRecord
 
-GPU_USAGE_RE = re.compile(r"GR3D_FREQ (\d+)%")
-GPU_TEMP_RE = re.compile(r"GPU@(\d+(?:\.\d+)?)C")
-GPU_POWER_RE = re.compile(r"POM_5V_GPU (\d+)/(\d+)")
+TEGRASTATS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tegrastats")
 
 
-def run_tegrastats():
+def tegrastats_command() -> List[str]:
+    return [TEGRASTATS, "--interval", str(TEGRASTATS_INTERVAL_MS)]
+
+
+def run_tegrastats(gpu: bool = True):
     # Run the tegrastats command
-    script_path = os.path.dirname(os.path.abspath(__file__))
-    process = subprocess.Popen([script_path + "/tegrastats"], stdout=subprocess.PIPE)
+    process = subprocess.Popen(tegrastats_command(), stdout=subprocess.PIPE)
     dtprocess = DTProcess.get_instance()
 
     # Continuously read and print the output
@@ -24,18 +27,29 @@ def run_tegrastats():
             break
         if output:
             try:
-                _decode(output)
+                decode_tegrastats(output, gpu)
             except Exception as e:
                 print(e)
                 pass
-
-
-def _decode(output):
-    gpu_temp_match = GPU_TEMP_RE.search(output)
-    KnowledgeBase.set("GPU_TEMP", float(gpu_temp_match.group(1)))
-
-    gpu_usage_match = GPU_USAGE_RE.search(output)
-    KnowledgeBase.set("GPU_USAGE", float(gpu_usage_match.group(1)))
-
-    gpu_power_match = GPU_POWER_RE.search(output)
-    KnowledgeBase.set("GPU_POWER", int(gpu_power_match.group(1))/1000.0)
+    clear_tegrastats()
+
+
+def decode_tegrastats(output, gpu: bool = True) -> TegrastatsRecord:
+    # the GPU telemetry is only published when it is not read from sysfs
+    record = parse_tegrastats(output)
+    values = {"tegrastats": {"tegrastats": record.as_dict()}}
+    if gpu and record.gpu_temperature is not None:
+        values["GPU_TEMP"] = record.gpu_temperature
+    if gpu and record.gpu_usage is not None:
+        values["GPU_USAGE"] = float(record.gpu_usage)
+    if gpu and record.gpu_power is not None:
+        values["GPU_POWER"] = record.gpu_power.current / 1000.0
+    # all the values of a line become visible at once, the record is kept until the next one
+    # (same as the 'tegrastats' resource) while the GPU telemetry expires if it stops coming
+    KnowledgeBase.set_many(values, ttls={"tegrastats": -1})
+    return record
+
+
+def clear_tegrastats():
+    # tegrastats stopped, the last record is not current anymore
+    KnowledgeBase.remove("tegrastats")
@@ -11,9 +11,13 @@ def health_watchdog():
     sleep_time = 1.0 / HEALTH_WATCHDOG_FREQUENZY_HZ
     process = DTProcess.get_instance()
     while not process.is_shutdown():
-        res = cached_resource('status')
-        if res['status'] == 'error':
-            set_module_unhealthy()
-        else:
-            set_module_healthy()
+        check_health()
         time.sleep(sleep_time)
+
+
+def check_health():
+    res = cached_resource('status')
+    if res['status'] == 'error':
+        set_module_unhealthy()
+    else:
+        set_module_healthy()
@@ -0,0 +1,79 @@
+"""
+Entry point of the worker processes started by health_api.supervisor.
+
+Requests are read from stdin and responses are written to stdout, both as pickles prefixed
+by their length (4 bytes, big endian). A request is a tuple (function, args, breakers), the
+response is a tuple (success, result or exception, breakers). The circuit breakers of the
+supervisor are installed before the call, those changed by the call are sent back, so that
+their state is reported by (and kept in) the supervisor.
+"""
+import os
+import pickle
+import struct
+import sys
+from typing import Any, BinaryIO, Optional
+
+from health_api.breaker import CircuitBreakers
+
+HEADER = struct.Struct('!I')
+
+
+def read_message(stream: BinaryIO) -> Optional[Any]:
+    header = _read_exact(stream, HEADER.size)
+    if header is None:
+        return None
+    body = _read_exact(stream, HEADER.unpack(header)[0])
+    if body is None:
+        return None
+    return pickle.loads(body)
+
+
+def write_message(stream: BinaryIO, message: Any):
+    body = pickle.dumps(message)
+    stream.write(HEADER.pack(len(body)) + body)
+    stream.flush()
+
+
+def collect(method: str) -> Any:
+    # runs a collector of the board, e.g., collect('get_voltage')
+    from health_api.boards import get_board
+    return getattr(get_board(), method)()
+
+
+def _read_exact(stream: BinaryIO, size: int) -> Optional[bytes]:
+    buf = b''
+    while len(buf) < size:
+        chunk = stream.read(size - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return buf
+
+
+def main():
+    # keep the protocol channel for ourselves, everything printed goes to stderr instead
+    channel = os.fdopen(os.dup(sys.stdout.fileno()), 'wb', buffering=0)
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    requests = os.fdopen(sys.stdin.fileno(), 'rb', buffering=0)
+    while True:
+        request = read_message(requests)
+        if request is None:
+            return
+        fcn, args, breakers = request
+        CircuitBreakers.restore(breakers)
+        # noinspection PyBroadException
+        try:
+            success, result = True, fcn(*args)
+        except BaseException as e:
+            success, result = False, e
+        # send back only what changed, the supervisor might have updated the others meanwhile
+        changed = {name: snapshot for name, snapshot in CircuitBreakers.snapshot().items()
+                   if breakers.get(name, None) != snapshot}
+        try:
+            write_message(channel, (success, result, changed))
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            write_message(channel, (False, RuntimeError(str(e)), changed))
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@ import os
 from typing import List
 from typing import Type
 
-from health_api.boards import NvidiaJetson
+from health_api.boards import get_board_profile, BoardFamily
 from robot.types import Robot, HardwareComponent, I2CBus, BusType, ComponentType, I2CBusAnyOf
 from .db21m import DB21M
 
@@ -51,18 +51,18 @@ class _DB21J_NanoB01(_DB21J_Base):
 DB21J: Type[Robot] = Robot
 
 
-if os.environ.get("ROBOT_CONFIGURATION", None) == "DB21J" and NvidiaJetson.is_instance_of():
-    if NvidiaJetson.is_A02():
-        print("Detected Jetson Nano 4GB (Carrier Board: A02).")
-        DB21J = _DB21J_NanoA02
-    elif NvidiaJetson.is_B01():
-        print("Detected Jetson Nano 4GB (Carrier Board: B01).")
-        DB21J = _DB21J_NanoB01
-    else:
-        nano = NvidiaJetson()
-        board = nano.get_hardware()
-        hardware = board["hardware"]
-        raise ValueError(f"Board {hardware} not supported!")
+if os.environ.get("ROBOT_CONFIGURATION", None) == "DB21J":
+    profile = get_board_profile()
+    if profile.family is BoardFamily.NVIDIA_JETSON:
+        is_nano_4gb = profile.model == "Nano"
+        if is_nano_4gb and profile.carrier_board == "A02":
+            print("Detected Jetson Nano 4GB (Carrier Board: A02).")
+            DB21J = _DB21J_NanoA02
+        elif is_nano_4gb and profile.carrier_board == "B01":
+            print("Detected Jetson Nano 4GB (Carrier Board: B01).")
+            DB21J = _DB21J_NanoB01
+        else:
+            raise ValueError(f"Board {profile.as_dict()} not supported!")
 
 
 __all__ = [
@@ -0,0 +1,189 @@
+import errno
+from concurrent.futures import ThreadPoolExecutor, Future
+from threading import Event
+from typing import Callable, Any, Iterable, Set, Dict, List, Optional
+
+import smbus
+
+from health_api.constants import I2C_SCANNER_WORKERS
+from health_api.supervisor import Supervisor, CollectorTimeout, WorkersUnavailable
+
+ALL_ADDRESSES = range(0, 0x80)
+
+
+class I2CScanner:
+    """
+    Probes I2C buses for devices.
+
+    Buses hanging off of the same root bus (e.g., the channels of a multiplexer) share the
+    same wires and are scanned one after the other (parents first), independent buses are
+    scanned in parallel. The `smbus_factory` (bus number -> SMBus-like object) can be replaced,
+    e.g., with a fake backend.
+    """
+
+    def __init__(self, smbus_factory: Callable[[int], Any] = smbus.SMBus,
+                 workers: int = I2C_SCANNER_WORKERS):
+        self._smbus_factory = smbus_factory
+        self._workers = workers
+
+    def probe(self, number: int, addresses: Iterable[int] = ALL_ADDRESSES) -> Set[str]:
+        try:
+            bus = self._smbus_factory(number)
+        except FileNotFoundError:
+            raise RuntimeError(
+                "I2C Bus #%d not found, check if enabled in config!" % number
+            )
+        found = set()
+        try:
+            for addr in addresses:
+                try:
+                    bus.read_byte(addr)
+                except OSError as e:
+                    # the address is in use by a kernel driver, there is a device there
+                    if e.errno == errno.EBUSY:
+                        found.add(hex(addr))
+                    continue
+                found.add(hex(addr))
+        finally:
+            close = getattr(bus, "close", None)
+            if close is not None:
+                close()
+        return found
+
+    def scan(self, buses: Iterable[Any], addresses: Optional[Dict[int, Set[int]]] = None,
+             cached: bool = True):
+        """
+        Runs the detection step of the given buses (and their parents). If `addresses` is
+        given, only the addresses listed for each bus number are probed (targeted mode).
+        Detections cached for this boot are only used if `cached` is set.
+        """
+        with self.start(buses, addresses, cached) as scan:
+            scan.wait()
+
+    def start(self, buses: Iterable[Any], addresses: Optional[Dict[int, Set[int]]] = None,
+              cached: bool = True) -> 'I2CScan':
+        """
+        Same as `scan` but returns as soon as the scan is started, use `I2CScan.wait` to wait
+        for (some of) the buses to be scanned.
+        """
+        groups: Dict[int, List[Any]] = {}
+        seen: Set[int] = set()
+        for bus in buses:
+            # the chain from the root bus down to this bus
+            chain = []
+            while bus is not None:
+                chain.insert(0, bus)
+                bus = bus.parent
+            for bus in chain:
+                if bus.number not in seen:
+                    seen.add(bus.number)
+                    groups.setdefault(chain[0].number, []).append(bus)
+        if not groups:
+            return I2CScan(None, {}, {})
+        done = {number: Event() for number in seen}
+        pool = ThreadPoolExecutor(max_workers=min(len(groups), self._workers),
+                                  thread_name_prefix="i2c-scanner")
+        futures = {root: pool.submit(self._scan_group, group, addresses, cached, done)
+                   for root, group in groups.items()}
+        return I2CScan(pool, futures, done)
+
+    def _scan_group(self, group: List[Any], addresses: Optional[Dict[int, Set[int]]],
+                    cached: bool, done: Dict[int, Event]):
+        try:
+            for bus in group:
+                targets = sorted(addresses.get(bus.number, set())) if addresses is not None \
+                    else None
+                try:
+                    bus.detect(targets, self, cached)
+                except RuntimeError as e:
+                    print("WARNING", str(e))
+                done[bus.number].set()
+        finally:
+            # never leave anyone waiting, errors are raised by I2CScan.wait
+            for bus in group:
+                done[bus.number].set()
+
+
+class I2CScan:
+    """
+    A scan started by `I2CScanner.start`. Each bus can be waited for as soon as it (and its
+    parents) are scanned, independently of the rest of the scan.
+    """
+
+    def __init__(self, pool: Optional[ThreadPoolExecutor], futures: Dict[int, Future],
+                 done: Dict[int, Event]):
+        self._pool = pool
+        # root bus number -> scan of the group of buses sharing that root
+        self._futures = futures
+        # bus number -> set once the bus is scanned
+        self._done = done
+
+    def wait(self, buses: Optional[Iterable[Any]] = None):
+        """
+        Waits for the given buses to be scanned, all of them if `buses` is not given.
+        """
+        if buses is None:
+            for future in self._futures.values():
+                future.result()
+            return
+        for bus in buses:
+            done = self._done.get(bus.number, None)
+            if done is None:
+                # not part of this scan
+                continue
+            done.wait()
+            root = bus
+            while root.parent is not None:
+                root = root.parent
+            # raise the error that interrupted the scan of this group, if any
+            future = self._futures[root.number]
+            if future.done():
+                future.result()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> 'I2CScan':
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class SupervisedI2CScanner(I2CScanner):
+    """
+    Same as I2CScanner but the buses are probed by the supervised worker processes, a wedged
+    bus makes its probe time out instead of blocking the detection forever. Buses are probed
+    in-process when all the workers are busy.
+    """
+
+    def probe(self, number: int, addresses: Iterable[int] = ALL_ADDRESSES) -> Set[str]:
+        addresses = list(addresses)
+        # a worker that dies on us says nothing about the bus, give it a second chance
+        for attempt in range(2):
+            try:
+                return Supervisor.call(_probe, number, addresses)
+            except WorkersUnavailable:
+                # the workers are busy (e.g., with the collectors), probe the bus ourselves
+                return super().probe(number, addresses)
+            except CollectorTimeout:
+                # only a probe that hung (and got its worker killed) fails the bus
+                raise RuntimeError("I2C Bus #%d did not respond in time!" % number)
+            except (BrokenPipeError, EOFError):
+                if attempt > 0:
+                    raise RuntimeError("I2C Bus #%d could not be probed, the worker "
+                                       "terminated unexpectedly!" % number)
+
+
+def _probe(number: int, addresses: List[int]) -> Set[str]:
+    # runs in a worker process
+    return I2CScanner().probe(number, addresses)
+
+
+__all__ = [
+    'I2CScanner',
+    'I2CScan',
+    'SupervisedI2CScanner',
+    'ALL_ADDRESSES'
+]
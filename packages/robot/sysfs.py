@@ -0,0 +1,119 @@
+import abc
+import os
+from threading import Lock
+from typing import Dict, List, Optional
+
+SYSFS_ROOT = "/sys"
+
+# names of the V4L2 nodes of CSI cameras: the image node of unicam (libcamera stack), the
+# legacy MMAL camera (Raspberry Pi) and the capture channels of the Tegra VI (Jetson), other
+# nodes (e.g., codecs, ISP, USB webcams) are not cameras on the CSI bus
+CSI_CAMERA_V4L2_PREFIXES = ("unicam-image", "mmal service", "vi-output")
+
+
+class _SysfsEnumerator(abc.ABC):
+    """
+    Lists devices by reading sysfs directly (no processes are spawned). Results are cached
+    until invalidate() is called (e.g., when a device is plugged in or out).
+    The `root` of the tree can be replaced (e.g., with a fake sysfs tree for testing).
+    """
+
+    def __init__(self, root: str = SYSFS_ROOT):
+        self._root = root
+        self._devices: Optional[List[Dict[str, str]]] = None
+        self._lock = Lock()
+
+    def list(self) -> List[Dict[str, str]]:
+        devices = self._devices
+        if devices is None:
+            with self._lock:
+                if self._devices is None:
+                    self._devices = self._enumerate()
+                devices = self._devices
+        return devices
+
+    def invalidate(self):
+        with self._lock:
+            self._devices = None
+
+    @abc.abstractmethod
+    def _enumerate(self) -> List[Dict[str, str]]:
+        pass
+
+    def _path(self, *parts: str) -> str:
+        return os.path.join(self._root, *parts)
+
+    @staticmethod
+    def _read(path: str) -> Optional[str]:
+        try:
+            with open(path, "rt") as fin:
+                return fin.read().strip()
+        except OSError:
+            return None
+
+    def _listdir(self, *parts: str) -> List[str]:
+        try:
+            return sorted(os.listdir(self._path(*parts)))
+        except OSError:
+            return []
+
+
+class USBEnumerator(_SysfsEnumerator):
+    """
+    USB devices, from /sys/bus/usb/devices/*/{busnum,devnum,idVendor,idProduct}.
+    """
+
+    def _enumerate(self) -> List[Dict[str, str]]:
+        devices = []
+        for name in self._listdir("bus", "usb", "devices"):
+            base = self._path("bus", "usb", "devices", name)
+            vendor = self._read(os.path.join(base, "idVendor"))
+            product = self._read(os.path.join(base, "idProduct"))
+            busnum = self._read(os.path.join(base, "busnum"))
+            devnum = self._read(os.path.join(base, "devnum"))
+            # interfaces (e.g., 1-1:1.0) do not have these
+            if None in (vendor, product, busnum, devnum):
+                continue
+            description = [self._read(os.path.join(base, f)) for f in ("manufacturer", "product")]
+            devices.append({
+                # same format used by lsusb
+                "bus": f"{int(busnum):03d}",
+                "device": f"{int(devnum):03d}",
+                "id": f"{vendor}:{product}",
+                "tag": " ".join(d for d in description if d),
+            })
+        return devices
+
+
+class V4L2Enumerator(_SysfsEnumerator):
+    """
+    Video (V4L2) devices, from /sys/class/video4linux/*/name.
+    """
+
+    def _enumerate(self) -> List[Dict[str, str]]:
+        devices = []
+        for node in self._listdir("class", "video4linux"):
+            name = self._read(self._path("class", "video4linux", node, "name"))
+            if name is None:
+                continue
+            devices.append({
+                "node": node,
+                "name": name,
+                "device": f"/dev/{node}",
+            })
+        return devices
+
+    def cameras(self) -> List[Dict[str, str]]:
+        # CSI cameras only
+        return [d for d in self.list() if d["name"].startswith(CSI_CAMERA_V4L2_PREFIXES)]
+
+
+USBDevices = USBEnumerator()
+VideoDevices = V4L2Enumerator()
+
+__all__ = [
+    'USBEnumerator',
+    'V4L2Enumerator',
+    'USBDevices',
+    'VideoDevices'
+]
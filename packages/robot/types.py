@@ -1,12 +1,13 @@
 import dataclasses
 import os
-import re
-import subprocess
 from datetime import datetime
 from enum import IntEnum, Enum
-from typing import Dict, Union, List, Set, Callable, Optional, overload
+from typing import Dict, Union, List, Set, Callable, Optional, Iterable, overload
 
-import smbus
+from health_api.constants import I2C_SCAN_TARGETED, COLLECTOR_ISOLATION
+from health_api.discovery import DiscoveryCache
+from robot.i2c import I2CScanner, I2CScan, SupervisedI2CScanner, ALL_ADDRESSES
+from robot.sysfs import USBDevices, VideoDevices
 
 
 class BusType(IntEnum):
@@ -47,6 +48,10 @@ class Bus:
     def detect(self):
         pass
 
+    def reset(self):
+        # forget the results of previous detections
+        pass
+
     def has(self, address: Union[str, int]) -> bool:
         return False
 
@@ -59,41 +64,50 @@ class I2CBus(Bus):
     number: int
     parent: Union['I2CBus', None] = None
     _detections: Union[Set[str], None] = None
+    # detections not explained by the parent bus, computed once
+    _exclusive: Union[Set[str], None] = None
 
-    def detect(self):
+    def detect(self, addresses: Optional[Iterable[int]] = None,
+               scanner: Optional[I2CScanner] = None, cached: bool = True):
         if self._detections is not None:
             return
+        # reuse the detections from an earlier run within the same boot
+        detections = DiscoveryCache.get("i2c", {}).get(str(self.number), None) if cached else None
+        if detections is not None:
+            self._detections = set(detections)
+            return
+        scanner = scanner or I2CScanner()
+        addresses = addresses if addresses is not None else ALL_ADDRESSES
         try:
-            _i2c_bus = smbus.SMBus(self.number)
-        except FileNotFoundError:
+            found = scanner.probe(self.number, addresses)
+        except RuntimeError:
             self._detections = set()
-            raise RuntimeError(
-                "I2C Bus #%d not found, check if enabled in config!" % self.number
-            )
-        # scan the bus
-        found = set()
-        for addr in range(0, 0x80):
-            try:
-                _i2c_bus.read_byte(addr)
-            except OSError as e:
-                if e.errno == 16:
-                    found.add(hex(addr))
-                continue
-            found.add(hex(addr))
+            raise
         # ---
         self._detections = found
+        if cached:
+            DiscoveryCache.update("i2c", str(self.number), sorted(found))
+
+    def reset(self):
+        self._detections = None
+        self._exclusive = None
+        if self.parent:
+            self.parent.reset()
+
+    def detections(self) -> Set[str]:
+        if self._exclusive is None:
+            # run the detection step if we have not done it yet
+            if self._detections is None:
+                self.detect()
+            # we don't count those devices that we see because connected to the parent
+            parent = self.parent.detections() if self.parent else set()
+            self._exclusive = self._detections - parent
+        return self._exclusive
 
     def has(self, address: Union[str, int]) -> bool:
-        # run the detection step if we have not done it yet
-        if self._detections is None:
-            self.detect()
         # sanitize address
         address = hex(address) if isinstance(address, int) else address
-        # we don't count those devices that we see because connected to the parent
-        if self.parent and self.parent.has(address):
-            return False
-        # finally, we check for detections
-        return address in self._detections
+        return address in self.detections()
 
     def as_dict(self) -> Dict:
         return {
@@ -133,6 +147,11 @@ class I2CBusAnyOf(Bus):
             except RuntimeError as e:
                 print("WARNING", str(e))
 
+    def reset(self):
+        self._matched = None
+        for bus in self.buses:
+            bus.reset()
+
     def has(self, address: Union[str, int]) -> bool:
         return self._matched is not None
 
@@ -181,23 +200,12 @@ class USBBus(Bus):
         return False
 
     def list_devices(self) -> List[USBDevice]:
-        device_re = re.compile(
-            "Bus\s+(?P<bus>\d+)\s+Device\s+(?P<device>\d+).+ID\s(?P<id>\w+:\w+)\s(?P<tag>.+)$", re.I)
-        df = subprocess.check_output("lsusb").decode('utf-8')
-        devices: List[USBDevice] = []
-        for i in df.split('\n'):
-            if i:
-                info = device_re.match(i)
-                if info:
-                    dinfo = info.groupdict()
-                    if int(dinfo.get("bus")) == self.number:
-                        devices.append(USBDevice(
-                            bus=dinfo.pop("bus"),
-                            device=dinfo.pop("device"),
-                            id=dinfo.pop("id"),
-                            tag=dinfo.pop("tag"),
-                        ))
-        return devices
+        return [USBDevice(**dev) for dev in USBDevices.list() if int(dev["bus"]) == self.number]
+
+    @staticmethod
+    def invalidate():
+        # forget the list of devices, e.g., when a device is plugged in or out
+        USBDevices.invalidate()
 
 
 @dataclasses.dataclass
@@ -211,7 +219,12 @@ class CSIBus(Bus):
         }
 
     def has(self, address: Union[str, int]) -> bool:
-        return "supported=1" in subprocess.check_output(["vcgencmd", "get_camera"]).decode("utf-8")
+        return len(VideoDevices.cameras()) > 0
+
+    @staticmethod
+    def invalidate():
+        # forget the list of cameras, e.g., when a camera driver is loaded or unloaded
+        VideoDevices.invalidate()
 
 
 class GPIO(Bus):
@@ -280,28 +293,90 @@ class Robot:
     def get_i2c_buses() -> List[int]:
         return [1]
 
-    def get_components(self) -> List[HardwareComponent]:
-        return self._detect_components(self._get_components())
+    def get_components(self, progress: Optional[Callable[[HardwareComponent], None]] = None) \
+            -> List[HardwareComponent]:
+        components = self._get_components()
+        # reuse the detections from an earlier run within the same boot
+        detected = DiscoveryCache.get("components", None)
+        if detected is not None and all(c.key in detected for c in components):
+            for component in components:
+                component.detected = detected[component.key]
+            return components
+        components = self._detect_components(components, progress)
+        DiscoveryCache.set("components", {c.key: c.detected for c in components})
+        return components
+
+    def rescan(self, progress: Optional[Callable[[HardwareComponent], None]] = None) \
+            -> List[HardwareComponent]:
+        # discard the results of previous detections and detect the hardware again
+        DiscoveryCache.set("i2c", {})
+        USBBus.invalidate()
+        CSIBus.invalidate()
+        DiscoveryCache.set("components", None)
+        for component in self._get_components():
+            if component.bus:
+                component.bus.reset()
+        return self.get_components(progress)
+
+    def redetect(self, components: List[HardwareComponent]) -> List[HardwareComponent]:
+        # probe the given components again, bypassing the results cached for this boot
+        for component in components:
+            if component.bus:
+                component.bus.reset()
+        return self._detect_components(components, cached=False)
 
     def _get_components(self) -> List[HardwareComponent]:
         return []
 
     @staticmethod
-    def _detect_components(components: List[HardwareComponent]) -> List[HardwareComponent]:
-        # detect hardware
-        for component in components:
-            if component.bus:
-                try:
-                    component.bus.detect()
-                except RuntimeError as e:
-                    print("WARNING", str(e))
-                component.detected = component.bus.has(component.address)
-            if component.detection_tests:
-                for test in component.detection_tests:
-                    component.detected = component.detected and test()
+    def _detect_components(components: List[HardwareComponent],
+                           progress: Optional[Callable[[HardwareComponent], None]] = None,
+                           cached: bool = True) -> List[HardwareComponent]:
+        # scan the I2C buses in the background
+        with Robot._scan_i2c_buses(components, cached) as scan:
+            # detect hardware
+            for component in components:
+                if component.bus:
+                    # wait for the buses of this component only, the others keep scanning
+                    scan.wait(Robot._i2c_buses(component))
+                    try:
+                        component.bus.detect()
+                    except RuntimeError as e:
+                        print("WARNING", str(e))
+                    component.detected = component.bus.has(component.address)
+                if component.detection_tests:
+                    for test in component.detection_tests:
+                        component.detected = component.detected and test()
+                # report partial results
+                if progress is not None:
+                    progress(component)
         # ---
         return components
 
+    @staticmethod
+    def _scan_i2c_buses(components: List[HardwareComponent], cached: bool = True) -> I2CScan:
+        buses: Dict[int, I2CBus] = {}
+        targets: Dict[int, Set[int]] = {}
+        for component in components:
+            for bus in Robot._i2c_buses(component):
+                address = component.address if isinstance(component.address, int) \
+                    else int(component.address, 16)
+                # detections on a child bus are computed against those of its parent,
+                # so the parent needs to be probed at the same addresses
+                while bus is not None:
+                    buses[bus.number] = bus
+                    targets.setdefault(bus.number, set()).add(address)
+                    bus = bus.parent
+        scanner = SupervisedI2CScanner() if COLLECTOR_ISOLATION else I2CScanner()
+        return scanner.start(buses.values(), targets if I2C_SCAN_TARGETED else None, cached)
+
+    @staticmethod
+    def _i2c_buses(component: HardwareComponent) -> List[I2CBus]:
+        # the I2C buses the component might be found on
+        candidates = component.bus.buses if isinstance(component.bus, I2CBusAnyOf) \
+            else [component.bus]
+        return [bus for bus in candidates if isinstance(bus, I2CBus)]
+
     def serialize_components(self) -> List[Dict]:
         components = self.get_components()
         return [component.as_dict() for component in components]
@@ -0,0 +1,7 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the code lives in packages/, the same way it is laid out in the image
+sys.path.insert(0, os.path.join(ROOT, "packages"))
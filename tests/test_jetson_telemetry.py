@@ -0,0 +1,78 @@
+import os
+
+from health_api.boards.jetson_telemetry import JetsonTelemetry
+
+
+def _write(root, path: str, content: str):
+    path = os.path.join(str(root), path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wt") as fout:
+        fout.write(content + "\n")
+
+
+def _thermal_zones(root):
+    _write(root, "class/thermal/thermal_zone0/type", "CPU-therm")
+    _write(root, "class/thermal/thermal_zone0/temp", "41000")
+    _write(root, "class/thermal/thermal_zone1/type", "GPU-therm")
+    _write(root, "class/thermal/thermal_zone1/temp", "39500")
+
+
+def test_nano_iio(tmp_path):
+    # L4T 32: GPU load under /sys/devices/gpu.0, power through the ina3221x iio driver (mW)
+    _write(tmp_path, "devices/gpu.0/load", "423")
+    _thermal_zones(tmp_path)
+    device = "bus/i2c/drivers/ina3221x/6-0040/iio:device0"
+    _write(tmp_path, f"{device}/rail_name_0", "POM_5V_IN")
+    _write(tmp_path, f"{device}/in_power0_input", "3200")
+    _write(tmp_path, f"{device}/rail_name_1", "POM_5V_GPU")
+    _write(tmp_path, f"{device}/in_power1_input", "1250")
+    telemetry = JetsonTelemetry(root=str(tmp_path))
+    assert telemetry.available
+    assert telemetry.sample() == {"GPU_USAGE": 42.3, "GPU_TEMP": 39.5, "GPU_POWER": 1.25}
+
+
+def test_orin_hwmon(tmp_path):
+    # L4T 35: GPU load under the ga10b device, power through hwmon (mV and mA)
+    _write(tmp_path, "devices/platform/17000000.ga10b/load", "1000")
+    _thermal_zones(tmp_path)
+    _write(tmp_path, "class/hwmon/hwmon0/name", "tmp451")
+    _write(tmp_path, "class/hwmon/hwmon1/name", "ina3221")
+    _write(tmp_path, "class/hwmon/hwmon1/in1_label", "VDD_IN")
+    _write(tmp_path, "class/hwmon/hwmon1/in1_input", "5000")
+    _write(tmp_path, "class/hwmon/hwmon1/curr1_input", "1000")
+    _write(tmp_path, "class/hwmon/hwmon1/in2_label", "VDD_GPU")
+    _write(tmp_path, "class/hwmon/hwmon1/in2_input", "5000")
+    _write(tmp_path, "class/hwmon/hwmon1/curr2_input", "300")
+    telemetry = JetsonTelemetry(root=str(tmp_path))
+    assert telemetry.available
+    assert telemetry.sample() == {"GPU_USAGE": 100.0, "GPU_TEMP": 39.5, "GPU_POWER": 1.5}
+
+
+def test_shared_rail(tmp_path):
+    # Xavier NX: the GPU shares its rail with the CPU, there is no GPU power to report
+    _write(tmp_path, "devices/gpu.0/load", "0")
+    _write(tmp_path, "class/hwmon/hwmon0/name", "ina3221")
+    _write(tmp_path, "class/hwmon/hwmon0/in1_label", "VDD_IN")
+    _write(tmp_path, "class/hwmon/hwmon0/in2_label", "VDD_CPU_GPU_CV")
+    _write(tmp_path, "class/hwmon/hwmon0/in2_input", "5000")
+    _write(tmp_path, "class/hwmon/hwmon0/curr2_input", "300")
+    telemetry = JetsonTelemetry(root=str(tmp_path))
+    assert telemetry.sample() == {"GPU_USAGE": 0.0}
+
+
+def test_devfreq_fallback(tmp_path):
+    # unknown module, the GPU is found among the devfreq devices
+    _write(tmp_path, "devices/platform/bus@0/17000000.gpu/load", "50")
+    os.makedirs(os.path.join(str(tmp_path), "class/devfreq/17000000.gpu"))
+    os.symlink(os.path.join(str(tmp_path), "devices/platform/bus@0/17000000.gpu"),
+               os.path.join(str(tmp_path), "class/devfreq/17000000.gpu/device"))
+    telemetry = JetsonTelemetry(root=str(tmp_path))
+    assert telemetry.available
+    assert telemetry.sample() == {"GPU_USAGE": 5.0}
+
+
+def test_not_available(tmp_path):
+    # not a Jetson, tegrastats is used instead
+    _thermal_zones(tmp_path)
+    telemetry = JetsonTelemetry(root=str(tmp_path))
+    assert not telemetry.available
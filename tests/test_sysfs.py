@@ -0,0 +1,82 @@
+import os
+
+from robot.sysfs import USBEnumerator, V4L2Enumerator
+
+
+def _write(root, path: str, content: str):
+    path = os.path.join(str(root), path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wt") as fout:
+        fout.write(content + "\n")
+
+
+def _usb_device(root, name: str, busnum: int, devnum: int, usb_id: str, **kwargs):
+    base = f"bus/usb/devices/{name}"
+    vendor, product = usb_id.split(":")
+    _write(root, f"{base}/busnum", str(busnum))
+    _write(root, f"{base}/devnum", str(devnum))
+    _write(root, f"{base}/idVendor", vendor)
+    _write(root, f"{base}/idProduct", product)
+    for key, value in kwargs.items():
+        _write(root, f"{base}/{key}", value)
+
+
+def _video_device(root, node: str, name: str):
+    _write(root, f"class/video4linux/{node}/name", name)
+
+
+def test_usb_devices(tmp_path):
+    _usb_device(tmp_path, "usb1", 1, 1, "1d6b:0002",
+                manufacturer="Linux 4.9.253-tegra ehci_hcd", product="EHCI Host Controller")
+    _usb_device(tmp_path, "1-2", 1, 12, "0bda:8179", product="802.11n NIC")
+    # same format used by lsusb, zero-padded to three digits
+    assert USBEnumerator(root=str(tmp_path)).list() == [
+        {"bus": "001", "device": "012", "id": "0bda:8179", "tag": "802.11n NIC"},
+        {"bus": "001", "device": "001", "id": "1d6b:0002",
+         "tag": "Linux 4.9.253-tegra ehci_hcd EHCI Host Controller"},
+    ]
+
+
+def test_usb_interfaces_skipped(tmp_path):
+    _usb_device(tmp_path, "1-2", 1, 3, "0483:5740", manufacturer="Duckietown")
+    # interfaces of the device have none of busnum, devnum, idVendor and idProduct
+    _write(tmp_path, "bus/usb/devices/1-2:1.0/bInterfaceClass", "02")
+    _write(tmp_path, "bus/usb/devices/1-2:1.0/bInterfaceNumber", "00")
+    devices = USBEnumerator(root=str(tmp_path)).list()
+    assert [d["id"] for d in devices] == ["0483:5740"]
+
+
+def test_usb_devices_cached(tmp_path):
+    enumerator = USBEnumerator(root=str(tmp_path))
+    assert enumerator.list() == []
+    _usb_device(tmp_path, "1-2", 1, 3, "0483:5740")
+    # a device was plugged in, nobody said so yet
+    assert enumerator.list() == []
+    enumerator.invalidate()
+    assert len(enumerator.list()) == 1
+
+
+def test_cameras_raspberry_pi(tmp_path):
+    _video_device(tmp_path, "video0", "unicam-embedded")
+    _video_device(tmp_path, "video1", "unicam-image")
+    _video_device(tmp_path, "video10", "bcm2835-codec-decode")
+    _video_device(tmp_path, "video13", "bcm2835-isp")
+    _video_device(tmp_path, "video19", "rpivid")
+    enumerator = V4L2Enumerator(root=str(tmp_path))
+    assert len(enumerator.list()) == 5
+    assert enumerator.cameras() == [
+        {"node": "video1", "name": "unicam-image", "device": "/dev/video1"},
+    ]
+
+
+def test_cameras_jetson(tmp_path):
+    _video_device(tmp_path, "video0", "vi-output, imx219 6-0010")
+    cameras = V4L2Enumerator(root=str(tmp_path)).cameras()
+    assert [c["device"] for c in cameras] == ["/dev/video0"]
+
+
+def test_usb_webcam_not_a_camera(tmp_path):
+    # a webcam is not on the CSI bus
+    _video_device(tmp_path, "video0", "HD Pro Webcam C920")
+    _video_device(tmp_path, "video1", "HD Pro Webcam C920")
+    assert V4L2Enumerator(root=str(tmp_path)).cameras() == []
@@ -0,0 +1,59 @@
+from health_api.tegrastats_api.parser import parse_tegrastats, is_gpu_rail, Load, MemoryUsage, \
+    PowerRail
+
+NANO = "RAM 2133/3956MB (lfb 73x4MB) SWAP 0/1978MB (cached 0MB) CPU [12%@1479,3%@1479,off,off] " \
+       "EMC_FREQ 0% GR3D_FREQ 7%@921 APE 25 PLL@34.5C CPU@37C PMIC@100C GPU@34.5C AO@42C " \
+       "thermal@36C POM_5V_IN 2170/2170 POM_5V_GPU 120/110 POM_5V_CPU 248/248"
+
+ORIN_NANO = "RAM 2950/7620MB (lfb 1x4MB) SWAP 0/3810MB (cached 0MB) " \
+            "CPU [1%@729,0%@729,0%@729,0%@729,off,off] EMC_FREQ 0%@2133 GR3D_FREQ 0%@[305] " \
+            "VIC_FREQ 729 APE 174 cpu@47.5C soc2@45.968C soc0@46.312C gpu@46.5C tj@47.5C " \
+            "soc1@46.156C VDD_IN 4440mW/4440mW VDD_CPU_GPU_CV 479mW/479mW VDD_SOC 1358mW/1358mW"
+
+
+def test_nano():
+    record = parse_tegrastats(NANO)
+    assert record.ram == MemoryUsage(2133, 3956)
+    assert record.swap == MemoryUsage(0, 1978)
+    assert record.cpu == (Load(12, 1479), Load(3, 1479), Load(None), Load(None))
+    assert record.engines == {"EMC_FREQ": Load(0), "GR3D_FREQ": Load(7, 921)}
+    assert record.temperatures["PMIC"] == 100.0
+    assert record.rails["POM_5V_IN"] == PowerRail(2170, 2170)
+    assert record.values == {"APE": 25}
+    assert record.gpu_usage == 7
+    assert record.gpu_temperature == 34.5
+    assert record.gpu_power == PowerRail(120, 110)
+
+
+def test_orin_nano():
+    record = parse_tegrastats(ORIN_NANO)
+    assert record.engines["GR3D_FREQ"] == Load(0, 305)
+    assert record.rails["VDD_CPU_GPU_CV"] == PowerRail(479, 479)
+    assert record.gpu_usage == 0
+    assert record.gpu_temperature == 46.5
+    # the GPU shares its rail with the CPU
+    assert record.gpu_power is None
+
+
+def test_frequency_per_cluster():
+    record = parse_tegrastats(
+        "GR3D_FREQ 99%@[1300,1100] GPU 7000mW/6500mW VDD_GPU_SOC 8000mW/8000mW"
+    )
+    assert record.engines["GR3D_FREQ"] == Load(99, 1300)
+    assert record.gpu_power == PowerRail(7000, 6500)
+
+
+def test_missing_and_malformed_fields():
+    record = parse_tegrastats("RAM garbage GR3D_FREQ 12%@921 gpu@xC")
+    assert record.ram is None
+    assert record.temperatures == {}
+    assert record.gpu_usage == 12
+
+
+def test_gpu_rails():
+    assert is_gpu_rail("POM_5V_GPU")
+    assert is_gpu_rail("VDD_GPU")
+    assert is_gpu_rail("GPU")
+    assert not is_gpu_rail("VDD_CPU_GPU_CV")
+    assert not is_gpu_rail("VDD_GPU_SOC")
+    assert not is_gpu_rail("VDD_IN")
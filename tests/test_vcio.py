@@ -0,0 +1,101 @@
+import os
+from typing import Dict, List
+
+import pytest
+
+from health_api.boards import vcio
+from health_api.boards.raspberry_pi import RaspberryPi
+from health_api.boards.vcio import VCMailbox, IOCTL_MBOX_PROPERTY, REQUEST_SUCCESSFUL, \
+    TAG_GET_THROTTLED, TAG_GET_VOLTAGE, TAG_GET_FIRMWARE_HASH, VOLTAGE_ID_CORE
+
+
+class FakeMailbox:
+    """
+    Plays the firmware: answers the requests sent through ioctl with canned values.
+    """
+
+    def __init__(self, responses: Dict[int, List[int]], code: int = REQUEST_SUCCESSFUL):
+        self.responses = responses
+        self.code = code
+        self.requests = []
+
+    def ioctl(self, fd, request, buf, mutate):
+        assert request == IOCTL_MBOX_PROPERTY and mutate
+        tag = buf[2]
+        self.requests.append((tag, list(buf[5:-1])))
+        buf[1] = self.code
+        if tag in self.responses:
+            values = self.responses[tag]
+            buf[4] = REQUEST_SUCCESSFUL | len(values) * buf.itemsize
+            buf[5:5 + len(values)] = type(buf)('I', values)
+        return 0
+
+    def mailbox(self) -> VCMailbox:
+        return VCMailbox(ioctl=self.ioctl, opener=lambda path: 42)
+
+
+def test_get_throttled():
+    fake = FakeMailbox({TAG_GET_THROTTLED: [0x50005]})
+    assert fake.mailbox().get_throttled() == 0x50005
+    # a zero mask, the sticky bits are not cleared
+    assert fake.requests == [(TAG_GET_THROTTLED, [0])]
+
+
+def test_get_voltage():
+    # the firmware answers with (id, micro-volts)
+    fake = FakeMailbox({TAG_GET_VOLTAGE: [VOLTAGE_ID_CORE, 1200000]})
+    assert fake.mailbox().get_voltage(VOLTAGE_ID_CORE) == 1.2
+    assert fake.requests == [(TAG_GET_VOLTAGE, [VOLTAGE_ID_CORE, 0])]
+
+
+def test_get_firmware_hash():
+    words = [0xd0b0c0a0, 0x00000001, 0x12345678, 0x9abcdef0, 0x0000000f]
+    fake = FakeMailbox({TAG_GET_FIRMWARE_HASH: words})
+    assert fake.mailbox().get_firmware_hash() == \
+        "d0b0c0a000000001123456789abcdef00000000f"
+
+
+def test_request_failed():
+    # error bit (0x80000001) set by the firmware on a malformed request
+    fake = FakeMailbox({TAG_GET_THROTTLED: [0]}, code=0x80000001)
+    with pytest.raises(OSError):
+        fake.mailbox().get_throttled()
+
+
+def test_tag_not_processed():
+    # the firmware does not know the tag, the response bit is not set
+    fake = FakeMailbox({})
+    with pytest.raises(OSError):
+        fake.mailbox().get_throttled()
+
+
+def test_device_opened_once():
+    opened = []
+    fake = FakeMailbox({TAG_GET_THROTTLED: [0]})
+    mailbox = VCMailbox(ioctl=fake.ioctl, opener=lambda path: opened.append(path) or 42)
+    mailbox.get_throttled()
+    mailbox.get_throttled()
+    assert opened == [vcio.VCIO_DEVICE]
+
+
+def test_fallback_to_vcgencmd(tmp_path, monkeypatch):
+    # no /dev/vcio (e.g., not a Raspberry Pi or not mapped in the container)
+    monkeypatch.setattr(vcio, "VCIO_DEVICE", os.path.join(str(tmp_path), "vcio"))
+    monkeypatch.setattr(vcio, "__mailbox__", None)
+    assert vcio.get_mailbox() is None
+    outputs = {
+        'measure_volts': {'volt': '1.2000V'},
+        'get_throttled': {'throttled': '0x50000'},
+    }
+    commands = []
+
+    def command_output(cmd, key, default='ND', cache=False):
+        commands.append(cmd[1:])
+        return outputs[cmd[1]]
+
+    monkeypatch.setattr(RaspberryPi, "_command_output", staticmethod(command_output))
+    board = RaspberryPi()
+    assert board.get_voltage() == {'volts': {'core': 1.2, 'ram': 1.2}}
+    assert board.get_throttled()['throttling']['under-voltage-occurred']
+    assert commands == [['measure_volts', 'core'], ['measure_volts', 'sdram_i'],
+                        ['get_throttled']]